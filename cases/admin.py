@@ -2,14 +2,44 @@ from django.contrib import admin
 from .models import (
     Appellant,
     AppellantFile,
+    DriveUploadJob,
     Case,
+    CaseDriveFile,
+    CaseSetupJob,
+    CaseStat,
+    FeeSchedule,
     Address,
     Generation
     )
+from .fees import recompute_total_payments
+
+
+@admin.action(description="Preview recomputed totals of selected unpaid cases")
+def preview_total_payments(modeladmin, request, queryset):
+    changes = recompute_total_payments(queryset.exclude(payment_status="COMPLETED"), dry_run=True)
+    for pk, case_no, old_total, new_total in changes[:50]:
+        modeladmin.message_user(request, f"{case_no or pk}: {old_total} -> {new_total}")
+    modeladmin.message_user(request, f"{len(changes)} case total(s) would change")
+
+
+@admin.action(description="Recompute totals of selected unpaid cases")
+def recompute_selected_total_payments(modeladmin, request, queryset):
+    changes = recompute_total_payments(queryset.exclude(payment_status="COMPLETED"))
+    modeladmin.message_user(request, f"Updated the total of {len(changes)} case(s)")
+
+
+class CaseAdmin(admin.ModelAdmin):
+    actions = [preview_total_payments, recompute_selected_total_payments]
+
 
 # Register your models here.
 admin.site.register(Appellant)
 admin.site.register(AppellantFile)
-admin.site.register(Case)
+admin.site.register(DriveUploadJob)
+admin.site.register(Case, CaseAdmin)
+admin.site.register(CaseDriveFile)
+admin.site.register(CaseSetupJob)
+admin.site.register(CaseStat)
+admin.site.register(FeeSchedule)
 admin.site.register(Address)
 admin.site.register(Generation)
\ No newline at end of file
@@ -0,0 +1,27 @@
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from .models import Case
+
+CaseAppellant = Case.appellants.through
+
+
+def _count_subquery(**filters):
+    rows = (
+        CaseAppellant.objects.filter(case_id=OuterRef("pk"), **filters)
+        .order_by()
+        .values("case_id")
+        .annotate(total=Count("*"))
+        .values("total")
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+
+def refresh_appellant_counts(case_ids):
+    """Recount appellant_count and minor_count of the given cases from the M2M, in one UPDATE.
+
+    Counting again rather than adding deltas keeps the columns right even after missed signals.
+    """
+    return Case.objects.filter(pk__in=case_ids).update(
+        appellant_count=_count_subquery(),
+        minor_count=_count_subquery(appellant__is_minor=True),
+    )
@@ -4,7 +4,7 @@ from django.apps import AppConfig
 class CasesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cases'
-    
-    # def ready(self):
-    #     # Import signals here so that they are registered
-    #     import cases.signals
\ No newline at end of file
+
+    def ready(self):
+        # Import signals here so that they are registered
+        import cases.signals
\ No newline at end of file
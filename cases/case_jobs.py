@@ -0,0 +1,46 @@
+from django.conf import settings
+from .drive_sync import sync_case_files
+from .freshness import touch_cases
+from .google_drive_service import ensure_case_drive_folder
+from .job_queue import claim_due_jobs, record_outcome, requeue_failed_jobs
+from .models import Case, CaseSetupJob
+from .services import link_first_appellant_user
+
+
+def _max_attempts():
+    return getattr(settings, "CASE_SETUP_MAX_ATTEMPTS", 5)
+
+
+def claim_jobs(limit=10):
+    """Lock and mark up to `limit` due jobs as running so no other worker picks them up"""
+    return claim_due_jobs(CaseSetupJob.objects.all(), "running", getattr(settings, "CASE_SETUP_STALE_SECONDS", 900), limit)
+
+
+def process_job(job):
+    """Create the case's Drive folder, copy its appellants' files there and email the first appellant.
+
+    Every step is safe to repeat, so a failed job is simply run again from the start.
+    """
+    case = Case.objects.get(pk=job.case_id)
+    try:
+        if not ensure_case_drive_folder(case):
+            raise RuntimeError("Google Drive did not return a folder id")
+        sync_case_files(case)
+        link_first_appellant_user(case)
+        error = None
+    except Exception as e:
+        error = str(e)
+
+    record_outcome(job, error, "done", _max_attempts())
+    touch_cases([case.pk])
+    return job
+
+
+def process_pending(limit=10):
+    """Claim one batch of due jobs and run them"""
+    return [process_job(job) for job in claim_jobs(limit=limit)]
+
+
+def requeue_failed():
+    """Give every failed job a fresh set of attempts"""
+    return requeue_failed_jobs(CaseSetupJob.objects.all())
@@ -0,0 +1,68 @@
+import datetime
+import re
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from .models import Case, CaseNumberCounter
+
+CASE_NO_PATTERN = re.compile(r"^A-(\d{2})-(\d+)$")
+
+
+def year_prefix(year):
+    return f"A-{str(year)[2:4]}-"  # For example, 'A-25-'
+
+
+def format_case_no(year, number):
+    # Four digits, widening to five and more past 9999 so numbers never repeat
+    return f"{year_prefix(year)}{number:04d}"
+
+
+def highest_case_number(year):
+    """Highest number already used in the year's case numbers (0 if none)"""
+    case_nos = Case.objects.filter(case_no__startswith=year_prefix(year)).values_list("case_no", flat=True)
+    # Compared as numbers: as strings 'A-25-9999' sorts after 'A-25-10000'
+    numbers = [int(match.group(2)) for match in map(CASE_NO_PATTERN.match, case_nos) if match]
+    return max(numbers, default=0)
+
+
+def allocate_case_numbers(count=1, year=None):
+    """Reserve `count` consecutive case numbers for the year and return them as A-YY-NNNN strings.
+
+    The counter row is incremented before it is read, so concurrent callers queue on its row lock
+    and can never receive the same number.
+    """
+    year = year or datetime.datetime.now().year
+    with transaction.atomic():
+        updated = CaseNumberCounter.objects.filter(year=year).update(last_number=F("last_number") + count)
+        if not updated:
+            try:
+                with transaction.atomic():
+                    # First case of the year (or of this table): continue after any existing numbers
+                    CaseNumberCounter.objects.create(year=year, last_number=highest_case_number(year) + count)
+            except IntegrityError:
+                # Someone else created the counter meanwhile
+                CaseNumberCounter.objects.filter(year=year).update(last_number=F("last_number") + count)
+        last_number = CaseNumberCounter.objects.get(year=year).last_number
+
+    return [format_case_no(year, number) for number in range(last_number - count + 1, last_number + 1)]
+
+
+def claim_case_numbers(case_nos):
+    """Move the year counters past explicitly chosen A-YY-NNNN numbers, so allocate_case_numbers never hands them out"""
+    highest = {}
+    for match in map(CASE_NO_PATTERN.match, filter(None, case_nos)):
+        if match:
+            year = 2000 + int(match.group(1))
+            highest[year] = max(highest.get(year, 0), int(match.group(2)))
+
+    with transaction.atomic():
+        # In year order, like any other writer of several counters, so none of them deadlock
+        for year, number in sorted(highest.items()):
+            updated = CaseNumberCounter.objects.filter(year=year).update(last_number=Greatest(F("last_number"), number))
+            if updated:
+                continue
+            try:
+                with transaction.atomic():
+                    CaseNumberCounter.objects.create(year=year, last_number=max(number, highest_case_number(year)))
+            except IntegrityError:
+                CaseNumberCounter.objects.filter(year=year).update(last_number=Greatest(F("last_number"), number))
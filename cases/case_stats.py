@@ -0,0 +1,110 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from .models import Case, CaseStat
+
+# What a case contributes to the summary, in this order
+STAT_FIELDS = ("status", "payment_status", "lawyer_id", "total_payment")
+
+
+def stat_row(case):
+    return tuple(getattr(case, field) for field in STAT_FIELDS)
+
+
+def _keys(status, payment_status, lawyer_id):
+    return [
+        ("total", ""),
+        ("status", status or ""),
+        ("payment_status", payment_status or ""),
+        ("lawyer", str(lawyer_id) if lawyer_id else ""),
+    ]
+
+
+def _add(dimension, value, case_count, revenue):
+    updated = CaseStat.objects.filter(dimension=dimension, value=value).update(
+        case_count=F("case_count") + case_count, revenue=F("revenue") + revenue
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            CaseStat.objects.create(dimension=dimension, value=value, case_count=case_count, revenue=revenue)
+    except IntegrityError:
+        # Someone else created the row meanwhile
+        _add(dimension, value, case_count, revenue)
+
+
+def apply_stats_changes(removed=(), added=()):
+    """Take `removed` out of the summary and put `added` in; both are STAT_FIELDS tuples.
+
+    One UPDATE per summary row touched, in a fixed order so concurrent writers can't deadlock.
+    """
+    deltas = defaultdict(lambda: [0, Decimal(0)])
+    for sign, rows in ((-1, removed), (1, added)):
+        for status, payment_status, lawyer_id, total_payment in rows:
+            for key in _keys(status, payment_status, lawyer_id):
+                deltas[key][0] += sign
+                deltas[key][1] += sign * Decimal(total_payment or 0)
+
+    with transaction.atomic():
+        for (dimension, value), (case_count, revenue) in sorted(deltas.items()):
+            if case_count or revenue:
+                _add(dimension, value, case_count, revenue)
+
+
+def forget_lawyer(lawyer_id):
+    """Move a deleted lawyer's figures to "no lawyer"; the SET_NULL on their cases sends no Case signals"""
+    with transaction.atomic():
+        row = CaseStat.objects.select_for_update().filter(dimension="lawyer", value=str(lawyer_id)).first()
+        if row:
+            row.delete()
+            _add("lawyer", "", row.case_count, row.revenue)
+
+
+def rebuild_case_stats():
+    """Reconcile the summary with the cases table; returns [(dimension, value, old, new)] for the rows fixed.
+
+    The summary rows are locked first, so writers that commit meanwhile apply their changes after
+    the rebuild instead of being lost or counted twice.
+    """
+    with transaction.atomic():
+        current = {
+            (row.dimension, row.value): row
+            for row in CaseStat.objects.select_for_update().order_by("dimension", "value")
+        }
+        totals = Case.objects.aggregate(case_count=Count("pk"), revenue=Sum("total_payment"))
+        fresh = {("total", ""): (totals["case_count"], totals["revenue"] or Decimal(0))}
+        for dimension, field in (("status", "status"), ("payment_status", "payment_status"), ("lawyer", "lawyer_id")):
+            rows = Case.objects.order_by().values(field).annotate(case_count=Count("pk"), revenue=Sum("total_payment"))
+            for row in rows:
+                value = "" if row[field] is None else str(row[field])
+                fresh[(dimension, value)] = (row["case_count"], row["revenue"] or Decimal(0))
+
+        fixed = []
+        for key in sorted(set(current) | set(fresh)):
+            old = (current[key].case_count, current[key].revenue) if key in current else (0, Decimal(0))
+            new = fresh.get(key, (0, Decimal(0)))
+            if old == new:
+                continue
+            fixed.append((*key, old, new))
+            if key not in fresh:
+                current[key].delete()
+            elif key in current:
+                current[key].case_count, current[key].revenue = new
+                current[key].save(update_fields=["case_count", "revenue"])
+            else:
+                CaseStat.objects.create(dimension=key[0], value=key[1], case_count=new[0], revenue=new[1])
+    return fixed
+
+
+def case_stats():
+    """The summary as {"total": {...}, "status": {value: {...}}, ...}, read from the summary table alone"""
+    stats = {"total": {"count": 0, "revenue": "0.00"}, "status": {}, "payment_status": {}, "lawyer": {}}
+    for row in CaseStat.objects.filter(case_count__gt=0).order_by("dimension", "value"):
+        entry = {"count": row.case_count, "revenue": str(row.revenue)}
+        if row.dimension == "total":
+            stats["total"] = entry
+        else:
+            stats[row.dimension][row.value or "none"] = entry
+    return stats
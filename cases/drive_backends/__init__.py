@@ -0,0 +1,128 @@
+import threading
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+DEFAULT_DRIVE_BACKEND = "cases.drive_backends.google.GoogleDriveBackend"
+THROTTLE_SETTINGS = (
+    "DRIVE_RATE_LIMIT", "DRIVE_RATE_BURST", "DRIVE_RETRY_MAX_ATTEMPTS", "DRIVE_RETRY_BASE_DELAY", "DRIVE_RETRY_MAX_DELAY",
+)
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+class DriveError(Exception):
+    """A failed storage backend call; `status` carries the HTTP-style status code when known"""
+
+    def __init__(self, message, status=None, reason=None):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+
+
+def original_not_deleted(error):
+    """The error reported for a move whose copy worked but whose delete did not"""
+    return DriveError(f"Copied but original not deleted: {error}", status=error.status, reason=error.reason)
+
+
+class BaseDriveBackend:
+    """Storage operations the case and upload code needs from Google Drive.
+
+    Methods raise DriveError on failure. Ids and links are opaque strings.
+    """
+
+    def __init__(self, **options):
+        self.options = options
+
+    def create_folder(self, name, parent_id=None):
+        """Create a folder and return its id"""
+        raise NotImplementedError
+
+    def upload(self, folder_id, file_path, file_name):
+        """Upload a local file and return (file_id, link)"""
+        raise NotImplementedError
+
+    def start_upload(self, file_name, content_type=None, folder_id=None):
+        """Begin a streaming upload; returns an object with write(data), finish() -> (file_id, link) and abort()"""
+        raise NotImplementedError
+
+    def round_trip(self, method, *args):
+        """Make one request of an operation that takes several (a chunk of a streaming upload or download).
+
+        ThrottledDriveBackend replaces this to rate limit and retry each of them.
+        """
+        return method(*args)
+
+    def copy(self, file_id, folder_id):
+        """Copy a file into a folder and return the copy's (file_id, link)"""
+        raise NotImplementedError
+
+    def delete(self, file_id):
+        raise NotImplementedError
+
+    def download_chunks(self, file_id):
+        """Yield the content of a file in chunks"""
+        raise NotImplementedError
+
+    def move(self, file_id, folder_id):
+        """Move a file into a folder and return its (file_id, link) there"""
+        copied = self.copy(file_id, folder_id)
+        self.delete(file_id)
+        return copied
+
+    def batch_copy(self, file_ids, folder_id, delete_original=False):
+        """Copy (or move) many files.
+
+        Returns {file_id: (copied_id, link, error)}, where error is a DriveError or None on success.
+        """
+        results = {}
+        for file_id in dict.fromkeys(file_ids):
+            try:
+                copied_id, link = self.copy(file_id, folder_id)
+            except DriveError as error:
+                results[file_id] = (None, None, error)
+                continue
+            results[file_id] = (copied_id, link, None)
+            if delete_original:
+                try:
+                    self.delete(file_id)
+                except DriveError as error:
+                    results[file_id] = (copied_id, link, original_not_deleted(error))
+        return results
+
+
+def get_drive_backend():
+    """Return the process-wide backend configured by DRIVE_BACKEND / DRIVE_BACKEND_OPTIONS.
+
+    It is wrapped in a ThrottledDriveBackend, so every caller in the process shares one rate limit.
+    """
+    from .throttle import ThrottledDriveBackend
+
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend_class = import_string(getattr(settings, "DRIVE_BACKEND", DEFAULT_DRIVE_BACKEND))
+                _backend = ThrottledDriveBackend(
+                    backend_class(**getattr(settings, "DRIVE_BACKEND_OPTIONS", {})),
+                    rate=getattr(settings, "DRIVE_RATE_LIMIT", 10),
+                    burst=getattr(settings, "DRIVE_RATE_BURST", 20),
+                    max_attempts=getattr(settings, "DRIVE_RETRY_MAX_ATTEMPTS", 5),
+                    base_delay=getattr(settings, "DRIVE_RETRY_BASE_DELAY", 1.0),
+                    max_delay=getattr(settings, "DRIVE_RETRY_MAX_DELAY", 32.0),
+                )
+    return _backend
+
+
+def reset_drive_backend():
+    global _backend
+    with _backend_lock:
+        _backend = None
+
+
+@receiver(setting_changed)
+def _reset_on_setting_change(setting, **kwargs):
+    if setting in ("DRIVE_BACKEND", "DRIVE_BACKEND_OPTIONS") + THROTTLE_SETTINGS:
+        reset_drive_backend()
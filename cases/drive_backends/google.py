@@ -0,0 +1,353 @@
+import os.path
+import threading
+import httplib2
+from django.conf import settings
+from google.auth.transport.requests import AuthorizedSession, Request
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build
+from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
+from googleapiclient.errors import HttpError
+from requests import RequestException
+import os
+from . import BaseDriveBackend, DriveError, original_not_deleted
+
+# Scopes for Google Drive API (upload + folder create permission)
+SCOPES = ["https://www.googleapis.com/auth/drive.file"]
+CLIENT_SECRETS_FILE = "client_secret_963292558056-lk9kmqt60c3o85er2o9c2hmggftm4j9j.apps.googleusercontent.com.json"
+
+# Credentials are shared by the whole process; the service (and its httplib2
+# transport, which is not thread-safe) is cached once per thread.
+_credentials = None
+_credentials_lock = threading.Lock()
+_local = threading.local()
+
+
+def _token_file():
+    return getattr(settings, "GOOGLE_DRIVE_TOKEN_FILE", "token.json")
+
+
+def _save_credentials(creds):
+    with open(_token_file(), "w") as token:
+        token.write(creds.to_json())
+
+
+def _load_credentials():
+    """Read credentials from token.json, running the OAuth flow when they are unusable"""
+    creds = None
+    if os.path.exists(_token_file()):
+        creds = Credentials.from_authorized_user_file(_token_file(), SCOPES)
+
+    if not creds or not creds.valid:
+        if creds and creds.expired and creds.refresh_token:
+            creds.refresh(Request())
+        else:
+            flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRETS_FILE, SCOPES)
+            creds = flow.run_local_server(port=8001)
+        _save_credentials(creds)
+
+    return creds
+
+
+def get_credentials():
+    """Return the process-wide credentials, refreshing them under a lock once expired"""
+    global _credentials
+    creds = _credentials
+    if creds is not None and creds.valid:
+        return creds
+
+    with _credentials_lock:
+        # Another thread may have loaded or refreshed them while we waited
+        if _credentials is None:
+            _credentials = _load_credentials()
+        elif not _credentials.valid:
+            _credentials.refresh(Request())
+            _save_credentials(_credentials)
+        return _credentials
+
+
+def _new_http():
+    return httplib2.Http(timeout=getattr(settings, "GOOGLE_DRIVE_HTTP_TIMEOUT", 60))
+
+
+def get_google_drive_service():
+    """Return the Google Drive API service cached for the current thread"""
+    creds = get_credentials()
+    service = getattr(_local, "service", None)
+    # A forked worker must not reuse the parent's open connections
+    if service is None or _local.pid != os.getpid():
+        http = AuthorizedHttp(creds, http=_new_http())
+        service = build("drive", "v3", http=http, cache_discovery=False)
+        _local.service = service
+        _local.pid = os.getpid()
+    return service
+
+
+def get_authorized_session():
+    """Return a requests session for raw Drive upload calls, cached for the current thread"""
+    creds = get_credentials()
+    session = getattr(_local, "session", None)
+    if session is None or _local.session_pid != os.getpid():
+        session = AuthorizedSession(creds)
+        _local.session = session
+        _local.session_pid = os.getpid()
+    return session
+
+
+def reset_google_drive_service():
+    """Drop the cached credentials and this thread's service (e.g. after revoking the token)"""
+    global _credentials
+    with _credentials_lock:
+        _credentials = None
+    _local.service = None
+    _local.session = None
+
+
+# Drive accepts at most 100 calls in one batch request
+DRIVE_BATCH_SIZE = 100
+
+
+def _drive_file_link(file_id):
+    return f"https://drive.google.com/file/d/{file_id}/view"
+
+
+# What a googleapiclient call raises: an HTTP error answer, or no answer at all (timeout, reset connection)
+DRIVE_CALL_ERRORS = (HttpError, httplib2.HttpLib2Error, TimeoutError, ConnectionError)
+
+
+def _drive_error(error):
+    """Translate one of DRIVE_CALL_ERRORS into a backend-neutral DriveError"""
+    if not isinstance(error, HttpError):
+        return DriveError(str(error), status=None)
+    reason = error.error_details[0].get("reason") if error.error_details else None
+    return DriveError(str(error), status=error.resp.status, reason=reason)
+
+
+def _request(method, *args, **kwargs):
+    try:
+        return method(*args, **kwargs)
+    except RequestException as error:
+        raise DriveError(str(error)) from error
+
+
+def _raise_for_status(response):
+    if response.status_code >= 400:
+        raise DriveError(
+            f"Google Drive upload failed with {response.status_code}: {response.text[:200]}",
+            status=response.status_code,
+        )
+
+
+DRIVE_UPLOAD_URL = "https://www.googleapis.com/upload/drive/v3/files"
+# Every chunk of a resumable upload except the last must be a multiple of 256 KiB
+RESUMABLE_CHUNK_UNIT = 256 * 1024
+
+
+class ResumableDriveUpload:
+    """Push a file to Drive chunk by chunk as it arrives, without knowing its size up front.
+
+    At most `chunk_size` bytes are held in memory at a time.
+    """
+
+    def __init__(self, file_name, content_type=None, folder_id=None, chunk_size=None, round_trip=None):
+        chunk_size = chunk_size or getattr(settings, "DRIVE_STREAM_CHUNK_SIZE", 32 * RESUMABLE_CHUNK_UNIT)
+        self.chunk_size = max(RESUMABLE_CHUNK_UNIT, chunk_size - chunk_size % RESUMABLE_CHUNK_UNIT)
+        self.timeout = getattr(settings, "GOOGLE_DRIVE_HTTP_TIMEOUT", 60)
+        self.session = get_authorized_session()
+        self.buffer = bytearray()
+        self.offset = 0  # bytes Drive has confirmed
+        # Every chunk is a request of its own; see BaseDriveBackend.round_trip
+        self.round_trip = round_trip or (lambda method, *args: method(*args))
+
+        metadata = {"name": file_name}
+        if folder_id:
+            metadata["parents"] = [folder_id]
+        response = _request(
+            self.session.post,
+            DRIVE_UPLOAD_URL,
+            params={"uploadType": "resumable", "fields": "id, webViewLink"},
+            json=metadata,
+            headers={"X-Upload-Content-Type": content_type or "application/octet-stream"},
+            timeout=self.timeout,
+        )
+        _raise_for_status(response)
+        self.session_uri = response.headers["Location"]
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.chunk_size:
+            self.round_trip(self._send, self.chunk_size)
+
+    def finish(self):
+        """Send whatever is left and return the new file's (id, webViewLink)"""
+        while True:
+            result = self.round_trip(self._send, len(self.buffer), self.offset + len(self.buffer))
+            if result:
+                return result
+
+    def abort(self):
+        try:
+            self.session.delete(self.session_uri, timeout=self.timeout)
+        except Exception as error:
+            print(f"An error occurred while cancelling upload: {error}")
+
+    def _send(self, length, total=None):
+        # Nothing is dropped from the buffer until Drive confirms it, so a failed chunk can be sent again
+        chunk = bytes(self.buffer[:length])
+        if chunk:
+            content_range = f"bytes {self.offset}-{self.offset + len(chunk) - 1}/{total if total is not None else '*'}"
+        else:
+            content_range = f"bytes */{total}"
+
+        response = _request(
+            self.session.put,
+            self.session_uri,
+            data=chunk,
+            headers={"Content-Range": content_range},
+            timeout=self.timeout,
+        )
+
+        if response.status_code == 308:
+            # Drive may keep less than was sent; the rest goes out again with the next request
+            received = response.headers.get("Range")
+            confirmed = int(received.rsplit("-", 1)[1]) + 1 if received else 0
+            if confirmed <= self.offset:
+                raise DriveError(f"Google Drive accepted none of the bytes sent at offset {self.offset}")
+            del self.buffer[:confirmed - self.offset]
+            self.offset = confirmed
+            return None
+
+        _raise_for_status(response)
+        del self.buffer[:length]
+        self.offset += length
+        file = response.json()
+        return file["id"], file.get("webViewLink")
+
+
+class GoogleDriveBackend(BaseDriveBackend):
+    """The real Google Drive, reached through googleapiclient"""
+
+    def create_folder(self, name, parent_id=None):
+        folder_metadata = {
+            'name': name,
+            'mimeType': 'application/vnd.google-apps.folder',
+        }
+        if parent_id:
+            folder_metadata['parents'] = [parent_id]
+
+        try:
+            folder = get_google_drive_service().files().create(body=folder_metadata, fields="id").execute()
+        except DRIVE_CALL_ERRORS as error:
+            raise _drive_error(error) from error
+        return folder.get("id")
+
+    def upload(self, folder_id, file_path, file_name):
+        media = MediaFileUpload(file_path, resumable=True)
+        file_metadata = {
+            'name': file_name,
+            'parents': [folder_id],  # Place the file inside the specified folder
+        }
+        try:
+            file = get_google_drive_service().files().create(
+                body=file_metadata, media_body=media, fields="id, webViewLink"
+            ).execute()
+        except DRIVE_CALL_ERRORS as error:
+            raise _drive_error(error) from error
+        return file['id'], file['webViewLink']
+
+    def start_upload(self, file_name, content_type=None, folder_id=None):
+        return ResumableDriveUpload(file_name, content_type, folder_id, round_trip=self.round_trip)
+
+    def copy(self, file_id, folder_id):
+        try:
+            copied_file = get_google_drive_service().files().copy(
+                fileId=file_id, body={'parents': [folder_id]}, fields="id"
+            ).execute()
+        except DRIVE_CALL_ERRORS as error:
+            raise _drive_error(error) from error
+        return copied_file['id'], _drive_file_link(copied_file['id'])
+
+    def delete(self, file_id):
+        try:
+            get_google_drive_service().files().delete(fileId=file_id).execute()
+        except DRIVE_CALL_ERRORS as error:
+            raise _drive_error(error) from error
+
+    def download_chunks(self, file_id):
+        request = get_google_drive_service().files().get_media(fileId=file_id)
+        sink = _ChunkSink()
+        downloader = MediaIoBaseDownload(sink, request, chunksize=8 * 1024 * 1024)
+        done = False
+        while not done:
+            # The downloader keeps its position, so a failed chunk is simply requested again
+            _, done = self.round_trip(self._next_chunk, downloader)
+            yield from sink.drain()
+
+    def _next_chunk(self, downloader):
+        try:
+            return downloader.next_chunk()
+        except DRIVE_CALL_ERRORS as error:
+            raise _drive_error(error) from error
+
+    def batch_copy(self, file_ids, folder_id, delete_original=False):
+        """Copy (or move) the files with Drive batch requests, up to DRIVE_BATCH_SIZE calls per HTTP request"""
+        service = get_google_drive_service()
+        file_ids = list(dict.fromkeys(file_ids))
+        results = {}
+
+        def on_copy(request_id, response, exception):
+            if exception is not None:
+                results[request_id] = (None, None, _drive_error(exception))
+            else:
+                results[request_id] = (response["id"], _drive_file_link(response["id"]), None)
+
+        def on_delete(request_id, response, exception):
+            if exception is not None:
+                copied_file_id, copied_file_link, _ = results[request_id]
+                results[request_id] = (copied_file_id, copied_file_link, original_not_deleted(_drive_error(exception)))
+
+        for start in range(0, len(file_ids), DRIVE_BATCH_SIZE):
+            chunk = file_ids[start:start + DRIVE_BATCH_SIZE]
+            batch = service.new_batch_http_request(callback=on_copy)
+            for file_id in chunk:
+                batch.add(
+                    service.files().copy(fileId=file_id, body={"parents": [folder_id]}, fields="id"),
+                    request_id=file_id,
+                )
+            try:
+                batch.execute()
+            except DRIVE_CALL_ERRORS as error:
+                for file_id in chunk:
+                    results.setdefault(file_id, (None, None, _drive_error(error)))
+
+            copied = [file_id for file_id in chunk if results.get(file_id, (None,))[0]]
+            if not delete_original or not copied:
+                continue
+
+            # Moving: drop the originals of the files that copied successfully
+            batch = service.new_batch_http_request(callback=on_delete)
+            for file_id in copied:
+                batch.add(service.files().delete(fileId=file_id), request_id=file_id)
+            try:
+                batch.execute()
+            except DRIVE_CALL_ERRORS as error:
+                for file_id in copied:
+                    results[file_id] = results[file_id][:2] + (original_not_deleted(_drive_error(error)),)
+
+        return results
+
+
+class _ChunkSink:
+    """File-like object MediaIoBaseDownload writes into, emptied after every chunk"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
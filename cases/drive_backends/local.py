@@ -0,0 +1,157 @@
+import contextlib
+import json
+import os
+import random
+import shutil
+import threading
+import time
+import uuid
+from django.conf import settings
+from . import BaseDriveBackend, DriveError, original_not_deleted
+
+
+class LocalDriveBackend(BaseDriveBackend):
+    """Filesystem-backed stand-in for Google Drive, for tests, benchmarks and offline development.
+
+    Options (DRIVE_BACKEND_OPTIONS):
+        root         directory holding the fake Drive (default MEDIA_ROOT/fake_drive)
+        latency      seconds every call sleeps, to mimic network round trips
+        error_rate   probability (0-1) that a call fails with `error_status`
+        error_status status of the injected failures (e.g. 403, 429, 503)
+
+    Failures can also be scripted with fail_next().
+    """
+
+    def __init__(self, root=None, latency=0.0, error_rate=0.0, error_status=503, seed=None):
+        super().__init__(root=root, latency=latency, error_rate=error_rate, error_status=error_status)
+        self.root = root or os.path.join(settings.MEDIA_ROOT, "fake_drive")
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.calls = 0
+        self._scripted_failures = []
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def fail_next(self, count=1, status=503, reason=None):
+        """Make the next `count` calls fail with the given status"""
+        with self._lock:
+            self._scripted_failures.extend([(status, reason)] * count)
+
+    def _call(self, operation, round_trip=True):
+        """Account for one API call: wait out the latency of its round trip, then maybe fail"""
+        with self._lock:
+            self.calls += 1
+            failure = self._scripted_failures.pop(0) if self._scripted_failures else None
+            if failure is None and self.error_rate and self.random.random() < self.error_rate:
+                failure = (self.error_status, None)
+        if round_trip and self.latency:
+            time.sleep(self.latency)
+        if failure:
+            status, reason = failure
+            raise DriveError(f"Injected {status} error during {operation}", status=status, reason=reason)
+
+    def _path(self, file_id):
+        return os.path.join(self.root, file_id)
+
+    def _link(self, file_id):
+        return f"file://{self._path(file_id)}"
+
+    def _write_metadata(self, file_id, metadata):
+        with open(self._path(file_id) + ".json", "w") as f:
+            json.dump(metadata, f)
+
+    def _read_metadata(self, file_id):
+        try:
+            with open(self._path(file_id) + ".json") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise DriveError(f"File not found: {file_id}", status=404, reason="notFound")
+
+    def _new_file(self, name, folder_id, mime_type=None):
+        file_id = uuid.uuid4().hex
+        self._write_metadata(file_id, {"name": name, "parents": [folder_id] if folder_id else [], "mimeType": mime_type})
+        return file_id
+
+    def create_folder(self, name, parent_id=None):
+        self._call("create_folder")
+        return self._new_file(name, parent_id, "application/vnd.google-apps.folder")
+
+    def upload(self, folder_id, file_path, file_name):
+        self._call("upload")
+        file_id = self._new_file(file_name, folder_id)
+        shutil.copyfile(file_path, self._path(file_id))
+        return file_id, self._link(file_id)
+
+    def start_upload(self, file_name, content_type=None, folder_id=None):
+        self._call("start_upload")
+        return _LocalUpload(self, self._new_file(file_name, folder_id, content_type))
+
+    def copy(self, file_id, folder_id, round_trip=True):
+        self._call("copy", round_trip)
+        metadata = self._read_metadata(file_id)
+        copied_id = self._new_file(metadata["name"], folder_id, metadata["mimeType"])
+        if os.path.exists(self._path(file_id)):
+            shutil.copyfile(self._path(file_id), self._path(copied_id))
+        return copied_id, self._link(copied_id)
+
+    def delete(self, file_id, round_trip=True):
+        self._call("delete", round_trip)
+        self._read_metadata(file_id)
+        os.remove(self._path(file_id) + ".json")
+        if os.path.exists(self._path(file_id)):
+            os.remove(self._path(file_id))
+
+    def download_chunks(self, file_id):
+        self.round_trip(self._call, "download")
+        self._read_metadata(file_id)
+        with open(self._path(file_id), "rb") as f:
+            while chunk := f.read(1024 * 1024):
+                yield chunk
+
+    def batch_copy(self, file_ids, folder_id, delete_original=False):
+        # Like a Drive batch request: one round trip per phase, each item can still fail on its own
+        file_ids = list(dict.fromkeys(file_ids))
+        results = {}
+        if self.latency:
+            time.sleep(self.latency)
+        for file_id in file_ids:
+            try:
+                copied_id, link = self.copy(file_id, folder_id, round_trip=False)
+                results[file_id] = (copied_id, link, None)
+            except DriveError as error:
+                results[file_id] = (None, None, error)
+
+        copied = [file_id for file_id in file_ids if results[file_id][0]]
+        if delete_original and copied:
+            if self.latency:
+                time.sleep(self.latency)
+            for file_id in copied:
+                try:
+                    self.delete(file_id, round_trip=False)
+                except DriveError as error:
+                    results[file_id] = results[file_id][:2] + (original_not_deleted(error),)
+        return results
+
+
+class _LocalUpload:
+    def __init__(self, backend, file_id):
+        self.backend = backend
+        self.file_id = file_id
+        self.file = open(backend._path(file_id), "wb")
+
+    def write(self, data):
+        self.file.write(data)
+
+    def finish(self):
+        self.file.close()
+        return self.file_id, self.backend._link(self.file_id)
+
+    def abort(self):
+        # upload_interrupted() may abort again after a failed write already did
+        self.file.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.backend._path(self.file_id))
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.backend._path(self.file_id) + ".json")
@@ -0,0 +1,160 @@
+import random
+import threading
+import time
+from . import BaseDriveBackend, DriveError
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded", "sharingRateLimitExceeded"}
+
+
+def is_rate_limited(error):
+    return error.status == 429 or (error.status == 403 and error.reason in RATE_LIMIT_REASONS)
+
+
+def is_retryable(error):
+    # No status means the request never got an answer (timeout, reset connection)
+    return error.status is None or error.status in RETRYABLE_STATUSES or is_rate_limited(error)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts of up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Take `tokens`, sleeping until they are available; returns the seconds waited"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Reserve now and go into debt, so later callers queue up behind this one
+            self.tokens -= tokens
+            wait = max(-self.tokens / self.rate, self.paused_until - now, 0.0)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds):
+        """Hold every caller back for `seconds`, e.g. after Drive reported the quota exhausted"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class ThrottledDriveBackend(BaseDriveBackend):
+    """Wraps another backend with a shared rate limit and retries with exponential backoff and jitter"""
+
+    def __init__(self, backend, rate=None, burst=None, max_attempts=5, base_delay=1.0, max_delay=32.0):
+        super().__init__()
+        self.backend = backend
+        self.bucket = TokenBucket(rate, burst or max(1, int(rate))) if rate else None
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._metrics = {"calls": 0, "queued": 0, "queued_seconds": 0.0, "throttled": 0, "retried": 0, "failed": 0}
+        self._metrics_lock = threading.Lock()
+        # Chunks of streaming uploads and downloads count against the same limit
+        backend.round_trip = self._call
+
+    def metrics(self):
+        with self._metrics_lock:
+            return dict(self._metrics)
+
+    def _count(self, **increments):
+        with self._metrics_lock:
+            for key, value in increments.items():
+                self._metrics[key] += value
+
+    def _acquire(self, tokens=1):
+        if not self.bucket:
+            return
+        waited = self.bucket.acquire(tokens)
+        if waited:
+            self._count(queued=1, queued_seconds=waited)
+
+    def _backoff(self, attempt):
+        # "Full jitter": anywhere between zero and the exponential cap
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _on_failure(self, error, attempt):
+        """Record a failed attempt and sleep before the next one; re-raise when retrying is pointless"""
+        if is_rate_limited(error):
+            self._count(throttled=1)
+        if not is_retryable(error) or attempt + 1 >= self.max_attempts:
+            self._count(failed=1)
+            raise error
+
+        delay = self._backoff(attempt)
+        if is_rate_limited(error) and self.bucket:
+            self.bucket.pause(delay)
+        self._count(retried=1)
+        time.sleep(delay)
+
+    def _call(self, method, *args, tokens=1):
+        self._count(calls=1)
+        attempt = 0
+        while True:
+            self._acquire(tokens)
+            try:
+                return method(*args)
+            except DriveError as error:
+                self._on_failure(error, attempt)
+                attempt += 1
+
+    def create_folder(self, name, parent_id=None):
+        return self._call(self.backend.create_folder, name, parent_id)
+
+    def upload(self, folder_id, file_path, file_name):
+        return self._call(self.backend.upload, folder_id, file_path, file_name)
+
+    def start_upload(self, file_name, content_type=None, folder_id=None):
+        return self._call(self.backend.start_upload, file_name, content_type, folder_id)
+
+    def copy(self, file_id, folder_id):
+        return self._call(self.backend.copy, file_id, folder_id)
+
+    def delete(self, file_id):
+        return self._call(self.backend.delete, file_id)
+
+    def download_chunks(self, file_id):
+        # Each chunk goes through round_trip
+        return self.backend.download_chunks(file_id)
+
+    def batch_copy(self, file_ids, folder_id, delete_original=False):
+        """Batch copy, retrying only the items that failed with a retryable error"""
+        pending = list(dict.fromkeys(file_ids))
+        results = {}
+        attempt = 0
+        while pending:
+            self._count(calls=1)
+            # Drive charges every call inside a batch against the quota
+            self._acquire(len(pending))
+            batch_results = self.backend.batch_copy(pending, folder_id, delete_original)
+            results.update(batch_results)
+
+            retry = [
+                file_id for file_id, (copied_id, _, error) in batch_results.items()
+                if copied_id is None and error is not None and is_retryable(error)
+            ]
+            if not retry:
+                break
+
+            throttled = sum(1 for file_id in retry if is_rate_limited(batch_results[file_id][2]))
+            self._count(throttled=throttled)
+            if attempt + 1 >= self.max_attempts:
+                self._count(failed=len(retry))
+                break
+
+            delay = self._backoff(attempt)
+            if throttled and self.bucket:
+                self.bucket.pause(delay)
+            self._count(retried=len(retry))
+            time.sleep(delay)
+            pending = retry
+            attempt += 1
+        return results
@@ -0,0 +1,55 @@
+from . import google_drive_service
+from .models import AppellantFile, Case, CaseDriveFile
+
+
+def _copy_into_case(case, files):
+    """Copy the files into the case folder in batch requests and record the successes in the ledger"""
+    files = list(files)
+    if not files:
+        return []
+
+    results = google_drive_service.batch_copy_files_to_folder(
+        [file_obj.drive_file_id for file_obj in files], case.drive_folder_id
+    )
+
+    synced = []
+    for file_obj in files:
+        copied_file_id, _, error = results[file_obj.drive_file_id]
+        if copied_file_id:
+            synced.append(CaseDriveFile(case=case, appellant_file=file_obj, drive_file_id=copied_file_id))
+        else:
+            print(f"Could not copy file {file_obj.pk} into case {case.pk}: {error}")
+
+    # A concurrent sync may have recorded some of these first
+    return CaseDriveFile.objects.bulk_create(synced, ignore_conflicts=True)
+
+
+def unsynced_files(case, appellant_ids=None):
+    """Uploaded files of the case's appellants that are not in the case folder yet"""
+    files = (
+        AppellantFile.objects.filter(appellant__cases=case, drive_file_id__isnull=False)
+        .exclude(drive_file_id="")
+        .exclude(case_copies__case=case)
+    )
+    if appellant_ids is not None:
+        files = files.filter(appellant_id__in=appellant_ids)
+    return files.distinct()
+
+
+def sync_case_files(case, appellant_ids=None):
+    """Bring the case folder up to date with its appellants' files, touching only missing ones"""
+    if not google_drive_service.ensure_case_drive_folder(case):
+        return []
+    return _copy_into_case(case, unsynced_files(case, appellant_ids))
+
+
+def sync_file_to_cases(file_obj):
+    """Copy a freshly uploaded file into the folder of every case its appellant belongs to"""
+    if not file_obj.drive_file_id:
+        return []
+    synced = []
+    cases = Case.objects.filter(appellants=file_obj.appellant_id).exclude(drive_files__appellant_file=file_obj)
+    for case in cases:
+        if google_drive_service.ensure_case_drive_folder(case):
+            synced += _copy_into_case(case, [file_obj])
+    return synced
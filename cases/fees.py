@@ -0,0 +1,101 @@
+from collections import defaultdict
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Case, FeeSchedule
+from .case_stats import apply_stats_changes
+
+FEE_SCHEDULE_CACHE_KEY = "fee-schedule:active"
+
+
+def get_fee_schedule():
+    """The active fee schedule with the highest version, cached; the built-in prices if none is stored"""
+    schedule = cache.get(FEE_SCHEDULE_CACHE_KEY)
+    if schedule is None:
+        schedule = FeeSchedule.objects.filter(is_active=True).order_by("-version").first() or FeeSchedule()
+        cache.set(FEE_SCHEDULE_CACHE_KEY, schedule, getattr(settings, "FEE_SCHEDULE_CACHE_TIMEOUT", 300))
+    return schedule
+
+
+def clear_fee_schedule_cache():
+    cache.delete(FEE_SCHEDULE_CACHE_KEY)
+
+
+def with_appellant_counts(cases):
+    """Annotate a Case queryset with its number of adult and minor appellants, from the counter columns"""
+    return cases.annotate(adults=F("appellant_count") - F("minor_count"), minors=F("minor_count"))
+
+
+def count_appellants(case_ids):
+    """{case_id: (adults, minors)} for all the cases, in one query"""
+    rows = with_appellant_counts(Case.objects.filter(pk__in=case_ids)).values_list("pk", "adults", "minors")
+    return {pk: (adults, minors) for pk, adults, minors in rows}
+
+
+def quote_cases(case_ids, schedule=None):
+    """{case_id: total_payment} for many cases at once"""
+    schedule = schedule or get_fee_schedule()
+    return {
+        pk: schedule.quote(adults, minors)
+        for pk, (adults, minors) in count_appellants(case_ids).items()
+    }
+
+
+def quote_case(case, schedule=None):
+    """Price one case from its appellant_count / minor_count, which cases.signals keeps current"""
+    return (schedule or get_fee_schedule()).quote(case.appellant_count - case.minor_count, case.minor_count)
+
+
+def recompute_total_payments(cases, schedule=None, batch_size=1000, dry_run=False):
+    """Reprice a Case queryset in batches of set-based UPDATEs, without going through Case.save().
+
+    Returns [(case_id, case_no, old_total, new_total)] for the cases whose total changed.
+    """
+    schedule = schedule or get_fee_schedule()
+    # The caller's filter again, as a subquery: re-checked when the rows are locked and written
+    selected = Case.objects.filter(pk__in=cases.values("pk"))
+    changes = []
+    last_pk = 0
+
+    while True:
+        # Pick the batch's ids first, so joins in the caller's queryset can't repeat rows
+        pks = list(
+            cases.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True).distinct()[:batch_size]
+        )
+        if not pks:
+            break
+        last_pk = pks[-1]
+
+        with transaction.atomic():
+            # Locked, so a case paid (or otherwise changed) meanwhile is either left out or read as it is now
+            batch_cases = selected.filter(pk__in=pks)
+            if not dry_run:
+                batch_cases = batch_cases.select_for_update()
+            rows = with_appellant_counts(batch_cases).values_list(
+                "pk", "case_no", "total_payment", "adults", "minors", "status", "payment_status", "lawyer_id"
+            )
+
+            batch, stats_before, stats_after = [], [], []
+            for pk, case_no, old_total, adults, minors, *stat_fields in rows:
+                new_total = schedule.quote(adults, minors)
+                if new_total != old_total:
+                    batch.append((pk, case_no, old_total, new_total))
+                    stats_before.append((*stat_fields, old_total))
+                    stats_after.append((*stat_fields, new_total))
+
+            if batch and not dry_run:
+                # Totals only depend on head counts, so a batch has few distinct values: one
+                # UPDATE per value beats bulk_update's per-row CASE. update() skips auto_now.
+                case_ids_by_total = defaultdict(list)
+                for pk, _, _, new_total in batch:
+                    case_ids_by_total[new_total].append(pk)
+                now = timezone.now()
+                for new_total, case_ids in case_ids_by_total.items():
+                    selected.filter(pk__in=case_ids).update(total_payment=new_total, updated_at=now)
+                # update() sends no signals
+                apply_stats_changes(removed=stats_before, added=stats_after)
+        changes.extend(batch)
+
+    return changes
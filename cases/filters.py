@@ -0,0 +1,30 @@
+import django_filters
+from .models import Case
+
+
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    pass
+
+
+class CaseFilterSet(django_filters.FilterSet):
+    """Case list filters; lists take comma-separated values, e.g. ?status__in=Court,Sentence.
+
+    Each filter has an index in Case.Meta.indexes that also keeps the list's (created_at, id) order.
+    """
+    # ?created_at_after=2025-01-01&created_at_before=2025-06-30T12:00:00
+    created_at = django_filters.IsoDateTimeFromToRangeFilter()
+    # ?date_of_payment_after=2025-01-01&date_of_payment_before=2025-01-31
+    date_of_payment = django_filters.DateFromToRangeFilter()
+    # Plain ids, without looking the users up first
+    lawyer = django_filters.NumberFilter()
+    lawyer__in = NumberInFilter(field_name='lawyer', lookup_expr='in')
+
+    class Meta:
+        model = Case
+        fields = {
+            'status': ['exact', 'in'],
+            'payment_status': ['exact', 'in'],
+            'lawyer': ['isnull'],
+            'is_judicial': ['exact'],
+            'is_consolare': ['exact'],
+        }
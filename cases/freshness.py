@@ -0,0 +1,16 @@
+from django.utils import timezone
+from .models import Appellant, Case
+
+
+def touch_cases(case_ids):
+    """Bump updated_at so the cases' ETag / Last-Modified change"""
+    return Case.objects.filter(pk__in=case_ids).update(updated_at=timezone.now())
+
+
+def touch_appellants(appellant_ids):
+    """Bump updated_at of the appellants and of every case they belong to"""
+    now = timezone.now()
+    Appellant.objects.filter(pk__in=appellant_ids).update(updated_at=now)
+    Case.objects.filter(pk__in=Case.appellants.through.objects.filter(appellant_id__in=appellant_ids).values("case_id")).update(
+        updated_at=now
+    )
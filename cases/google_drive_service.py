@@ -1,140 +1,104 @@
-import os.path
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from googleapiclient.errors import HttpError
-import os
-
-# Scopes for Google Drive API (upload + folder create permission)
-SCOPES = ["https://www.googleapis.com/auth/drive.file"]
-
-
-def get_google_drive_service():
-    """Authenticate and return the Google Drive API service"""
-    creds = None
-    if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                "client_secret_963292558056-lk9kmqt60c3o85er2o9c2hmggftm4j9j.apps.googleusercontent.com.json",
-                SCOPES,
-            )
-            creds = flow.run_local_server(port=8001)
-
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
-
-    service = build("drive", "v3", credentials=creds)
-    return service
+from django.core.cache import cache
+from django.db import transaction
+from .drive_backends import DriveError, get_drive_backend
+
+# Every Drive call goes through the backend selected by settings.DRIVE_BACKEND
+# (Google Drive in production, cases.drive_backends.local for tests/benchmarks).
 
 
 def create_drive_folder(folder_name, parent_id=None):
     """Create a folder in Google Drive and return its ID"""
-    service = get_google_drive_service()
-
-    folder_metadata = {
-        'name': folder_name,
-        'mimeType': 'application/vnd.google-apps.folder',
-    }
-
-    if parent_id:
-        folder_metadata['parents'] = [parent_id]
-
     try:
-        folder = service.files().create(
-            body=folder_metadata, fields="id"
-        ).execute()
-        return folder.get("id")
-    except HttpError as error:
+        return get_drive_backend().create_folder(folder_name, parent_id)
+    except DriveError as error:
         print(f"An error occurred while creating folder: {error}")
         return None
 
 
 def upload_to_drive(folder_id, file_path, file_name):
     """Upload a file to Google Drive"""
-    service = get_google_drive_service()
+    try:
+        # Return the file ID and link
+        return get_drive_backend().upload(folder_id, file_path, file_name)
+    except DriveError as error:
+        print(f"An error occurred: {error}")
+        return None, None
 
-    # Create a media file upload object
-    media = MediaFileUpload(file_path, resumable=True)
 
-    # Create the file metadata
-    file_metadata = {
-        'name': file_name,
-        'parents': [folder_id],  # Place the file inside the specified folder
-    }
-    print('file_metadata: ', file_metadata)
+def start_resumable_upload(file_name, content_type=None, folder_id=None):
+    """Begin a streaming upload; raises DriveError when the session cannot be opened"""
+    return get_drive_backend().start_upload(file_name, content_type, folder_id)
 
-    try:
-        # Upload the file
-        file = service.files().create(body=file_metadata, media_body=media, fields="id, webViewLink").execute()
-        print('file: ', file)
 
-        # Return the file ID and link
-        return file['id'], file['webViewLink']
+def _case_folder_cache_key(case_id):
+    return f"case-drive-folder:{case_id}"
 
-    except HttpError as error:
-        print(f"An error occurred: {error}")
-        return None, None
 
 def ensure_case_drive_folder(case):
-    if not case.drive_folder_id:
-        folder_id = create_drive_folder(case.name)
-        if folder_id:
-            case.drive_folder_id = folder_id
-            case.save()
-    return case.drive_folder_id
-
-def upload_appellant_file_to_case_drive(case, file_path, file_name):
-    folder_id = ensure_case_drive_folder(case)
-    file_id, view_link = upload_to_drive(folder_id, file_path, file_name)
-    return file_id, view_link
+    """Return the case's Drive folder id, creating the folder exactly once across concurrent callers"""
+    from cases.models import Case
+
+    if case.drive_folder_id:
+        return case.drive_folder_id
+
+    key = _case_folder_cache_key(case.pk)
+    # Another request may already have created it since this instance was loaded
+    folder_id = cache.get(key)
+
+    if not folder_id:
+        with transaction.atomic():
+            # The row lock makes every other caller wait here and then find the folder
+            locked = Case.objects.select_for_update().only("id", "case_no", "drive_folder_id").get(pk=case.pk)
+            folder_id = locked.drive_folder_id
+            if not folder_id:
+                folder_id = create_drive_folder(locked.case_no)
+                if folder_id:
+                    Case.objects.filter(pk=case.pk).update(drive_folder_id=folder_id)
+            if folder_id:
+                # Not before the row is committed: after a rollback the cache would name a folder no row has
+                transaction.on_commit(lambda: cache.set(key, folder_id, None))
+
+    if folder_id:
+        case.drive_folder_id = folder_id
+    return folder_id
+
+
+def delete_drive_file(file_id):
+    """Delete a file from Google Drive, returning whether it worked"""
+    try:
+        get_drive_backend().delete(file_id)
+        return True
+    except DriveError as error:
+        print(f"An error occurred while deleting file: {error}")
+        return False
 
-def upload_existing_appellant_files_to_case(appellant):
-    from cases.models import AppellantFile  # <== move import here
 
-    case = appellant.case
-    if not case:
-        return
+def copy_file_to_folder(file_id, destination_folder_id, delete_original=True):
+    """Copy a file to a destination folder, deleting the original unless told otherwise."""
+    backend = get_drive_backend()
+    try:
+        if delete_original:
+            return backend.move(file_id, destination_folder_id)
+        return backend.copy(file_id, destination_folder_id)
+    except DriveError as error:
+        print(f"An error occurred while copying file: {error}")
+        return None, None
 
-    folder_id = ensure_case_drive_folder(case)
-    files = AppellantFile.objects.filter(appellant=appellant)
 
-    for file_obj in files:
-        if not file_obj.file:
-            continue
+def batch_copy_files_to_folder(file_ids, destination_folder_id, delete_original=False):
+    """Copy (or, with delete_original, move) many files into a folder using Drive batch requests.
 
-        file_path = file_obj.file.path
-        # file_name = file_obj.file.name.split("/")[-1]
-        file_name = os.path.basename(file_obj.file.name)
+    Returns a dict mapping each source file id to (copied_file_id, copied_file_link, error);
+    error is None on success, and a failed copy has None for both ids.
+    """
+    return get_drive_backend().batch_copy(file_ids, destination_folder_id, delete_original)
 
-        file_id, web_view_link = upload_to_drive(folder_id, file_path, file_name)
 
-        if file_id:
-            file_obj.drive_file_id = file_id
-            file_obj.drive_file_link = web_view_link
-            file_obj.save()
+def download_drive_file(file_id):
+    """Yield the content of a Drive file in chunks"""
+    return get_drive_backend().download_chunks(file_id)
 
 
-def copy_file_to_folder(file_id, destination_folder_id):
-    """Copy a file using service account credentials to a destination folder."""
-    service = get_google_drive_service()
-    try:
-        copied_file = service.files().copy(
-            fileId=file_id,
-            body={'parents': [destination_folder_id]}
-        ).execute()
-        copied_file_id = copied_file['id']
-        if copied_file and copied_file_id:
-            # 3. Delete the original file
-            service.files().delete(fileId=file_id).execute()
-        copied_file_link = f"https://drive.google.com/file/d/{copied_file_id}/view"
-        return copied_file_id, copied_file_link
-    except HttpError as error:
-        print(f"An error occurred while copying file: {error}")
-        return None, None
\ No newline at end of file
+def drive_metrics():
+    """Counters of this process's Drive calls: calls, queued (and queued_seconds), throttled, retried, failed"""
+    return get_drive_backend().metrics()
@@ -0,0 +1,55 @@
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+# Shared by the job tables cases.upload_queue and cases.case_jobs work through
+# (status, attempts, next_attempt_at, last_error and updated_at).
+
+
+def retry_delay(attempts):
+    """Exponential backoff between attempts: 30s, 60s, 120s, ... capped at one hour"""
+    return timedelta(seconds=min(30 * 2 ** (attempts - 1), 3600))
+
+
+def claim_due_jobs(jobs, running_status, stale_seconds, limit=10):
+    """Lock and mark up to `limit` due jobs of the `jobs` queryset as `running_status` so no other worker picks them up.
+
+    The rows stay locked until the outermost transaction commits, so a caller can update related rows in the same one.
+    """
+    now = timezone.now()
+    # Jobs stuck in `running_status` belong to a worker that died halfway
+    stale_before = now - timedelta(seconds=stale_seconds)
+
+    with transaction.atomic():
+        jobs = list(
+            jobs.select_for_update(skip_locked=True)
+            .filter(Q(status="pending", next_attempt_at__lte=now) | Q(status=running_status, updated_at__lt=stale_before))
+            .order_by("next_attempt_at")[:limit]
+        )
+        for job in jobs:
+            job.status = running_status
+            job.attempts += 1
+            job.save(update_fields=["status", "attempts", "updated_at"])
+    return jobs
+
+
+def record_outcome(job, error, done_status, max_attempts):
+    """Save the result of a run: `done_status`, pending again after the backoff, or failed once out of attempts"""
+    if not error:
+        job.status = done_status
+        job.last_error = None
+    elif job.attempts >= max_attempts:
+        job.status = "failed"
+        job.last_error = error
+    else:
+        job.status = "pending"
+        job.last_error = error
+        job.next_attempt_at = timezone.now() + retry_delay(job.attempts)
+    job.save(update_fields=["status", "last_error", "next_attempt_at", "updated_at"])
+    return job
+
+
+def requeue_failed_jobs(jobs):
+    """Give every failed job of the `jobs` queryset a fresh set of attempts; returns how many"""
+    return jobs.filter(status="failed").update(status="pending", attempts=0, next_attempt_at=timezone.now())
@@ -0,0 +1,52 @@
+import hashlib
+from django.core.management.base import BaseCommand
+from cases import google_drive_service
+from cases.models import AppellantFile
+from cases.upload_handlers import compute_content_hash
+
+
+def hash_drive_file(file_id):
+    hasher = hashlib.sha256()
+    for chunk in google_drive_service.download_drive_file(file_id):
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class Command(BaseCommand):
+    help = "Compute content_hash for appellant files uploaded before hashing existed"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--skip-drive", action="store_true",
+                            help="Only hash files with a local copy; don't download from Drive")
+
+    def handle(self, *args, **options):
+        hashed, skipped = 0, 0
+        last_pk = 0
+
+        while True:
+            batch = list(
+                AppellantFile.objects.filter(content_hash__isnull=True, pk__gt=last_pk)
+                .order_by("pk")[:options["batch_size"]]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            for file_obj in batch:
+                try:
+                    if file_obj.file and file_obj.file.storage.exists(file_obj.file.name):
+                        file_obj.content_hash = compute_content_hash(file_obj.file)
+                    elif file_obj.drive_file_id and not options["skip_drive"]:
+                        file_obj.content_hash = hash_drive_file(file_obj.drive_file_id)
+                except Exception as e:
+                    self.stderr.write(f"file {file_obj.pk}: {e}")
+
+                if file_obj.content_hash:
+                    hashed += 1
+                else:
+                    skipped += 1
+
+            AppellantFile.objects.bulk_update([f for f in batch if f.content_hash], ["content_hash"])
+
+        self.stdout.write(f"Hashed {hashed} file(s), skipped {skipped}")
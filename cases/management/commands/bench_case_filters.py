@@ -0,0 +1,119 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import ExpressionWrapper, F, DateTimeField, Value
+from django.db.models.functions import Now
+from django.test import override_settings
+from django.test.utils import setup_databases, teardown_databases
+from rest_framework.test import APIClient
+
+from cases.models import CASE_STATUS, PAYMENT_STATUS, Case
+from users.models import CustomUser, UserRoles
+
+# Index names of cases.filters.CaseFilterSet (see Case.Meta.indexes)
+FILTER_INDEXES = [
+    "case_status_completed_idx", "case_payment_status_idx", "case_date_of_payment_idx",
+    "case_judicial_idx", "case_consolare_idx",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time filtered case lists against a generated fixture, with and without the CaseFilterSet indexes. "
+        "Runs in a throwaway test database (the configured name prefixed with test_), created and dropped here."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cases", type=int, default=500_000)
+        parser.add_argument("--requests", type=int, default=20, help="Requests per filter and variant")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def seed(self, count, batch_size):
+        admin = CustomUser.objects.create_user(email="bench-admin@example.com", password=None, role=UserRoles.ADMIN)
+        lawyers = [
+            CustomUser.objects.create_user(email=f"bench-lawyer-{i}@example.com", password=None, role=UserRoles.INTERNAL_LAWYER)
+            for i in range(50)
+        ]
+        statuses = [value for value, _ in CASE_STATUS]
+        payment_statuses = [value for value, _ in PAYMENT_STATUS]
+        start = date.today() - timedelta(days=3 * 365)
+
+        for offset in range(0, count, batch_size):
+            cases = []
+            for n in range(offset, min(offset + batch_size, count)):
+                paid = random.random() < 0.7
+                cases.append(Case(
+                    case_no=f"BENCH-{n}",
+                    status=random.choice(statuses),
+                    payment_status="COMPLETED" if paid else random.choice(payment_statuses),
+                    date_of_payment=start + timedelta(days=random.randrange(3 * 365)) if paid else None,
+                    lawyer=random.choice(lawyers),
+                    is_judicial=random.random() < 0.1,
+                    is_consolare=random.random() < 0.05,
+                    total_payment=0,
+                    created_by=admin,
+                ))
+            Case.objects.bulk_create(cases)
+
+        # Spread the cases over the last three years, one minute apart
+        Case.objects.filter(case_no__startswith="BENCH-").update(created_at=ExpressionWrapper(
+            Now() - F("id") % (3 * 365 * 24 * 60) * Value(timedelta(minutes=1)), output_field=DateTimeField()
+        ))
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE cases_case")
+        return admin, lawyers
+
+    def time_requests(self, client, query, requests):
+        timings = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = client.get("/api/v1/cases/", query)
+            timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.content
+        return statistics.median(timings)
+
+    def handle(self, *args, **options):
+        year = date.today().year
+        queries = {
+            "none": {},
+            "status": {"status": "Court"},
+            "status__in": {"status__in": "Court,Sentence,Hearing Date"},
+            "payment_status": {"payment_status": "COMPLETED"},
+            "date_of_payment": {"date_of_payment_after": f"{year - 1}-01-01", "date_of_payment_before": f"{year - 1}-01-31"},
+            "created_at": {"created_at_after": f"{year - 1}-03-01", "created_at_before": f"{year - 1}-03-08"},
+            "is_judicial": {"is_judicial": "true"},
+            "is_consolare": {"is_consolare": "true"},
+        }
+
+        results = {}
+        # Never the configured database: the fixture is large and the filter indexes get dropped
+        old_config = setup_databases(verbosity=options["verbosity"], interactive=False, aliases={"default"})
+        try:
+            self.stdout.write(f"Seeding {options['cases']} cases into {connection.settings_dict['NAME']}...")
+            with override_settings(ALLOWED_HOSTS=["*"]):
+                admin, lawyers = self.seed(options["cases"], options["batch_size"])
+                queries["lawyer"] = {"lawyer": lawyers[0].pk}
+                client = APIClient()
+                client.force_authenticate(admin)
+
+                for label, query in queries.items():
+                    results[label] = [self.time_requests(client, query, options["requests"])]
+
+                with connection.schema_editor() as editor:
+                    for index in Case._meta.indexes:
+                        if index.name in FILTER_INDEXES:
+                            editor.remove_index(Case, index)
+                for label, query in queries.items():
+                    results[label].append(self.time_requests(client, query, options["requests"]))
+        finally:
+            teardown_databases(old_config, verbosity=options["verbosity"])
+
+        self.stdout.write(f"{'filter':>16} {'indexed':>10} {'no index':>10}   (median ms, page of {settings.REST_FRAMEWORK['PAGE_SIZE']})")
+        for label, (indexed, unindexed) in results.items():
+            self.stdout.write(f"{label:>16} {indexed:10.1f} {unindexed:10.1f}")
@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+import httplib2
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build
+
+from cases.drive_backends import google as google_backend
+
+
+class FakeHttp:
+    """Stand-in for httplib2.Http that answers every Drive request locally"""
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        content = json.dumps({"id": "fake-file-id", "webViewLink": "https://drive.google.com/fake"})
+        return httplib2.Response({"status": "200", "content-type": "application/json"}), content.encode()
+
+
+def _write_fake_token(path):
+    expiry = datetime.utcnow() + timedelta(days=1)
+    creds = Credentials(
+        token="fake-token",
+        refresh_token="fake-refresh-token",
+        token_uri="https://oauth2.googleapis.com/token",
+        client_id="fake-client-id",
+        client_secret="fake-client-secret",
+        scopes=google_backend.SCOPES,
+        expiry=expiry,
+    )
+    with open(path, "w") as token:
+        token.write(creds.to_json())
+
+
+class Command(BaseCommand):
+    help = "Measure the per-call overhead of obtaining a Drive client, before and after caching"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--calls", type=int, default=200)
+
+    def create_folder(self, service):
+        service.files().create(
+            body={"name": "bench", "mimeType": "application/vnd.google-apps.folder"}, fields="id"
+        ).execute()
+
+    def run_uncached(self, token_path, calls):
+        # Mirrors the old get_google_drive_service(): read token.json and build() on every call
+        start = time.perf_counter()
+        for _ in range(calls):
+            creds = Credentials.from_authorized_user_file(token_path, google_backend.SCOPES)
+            service = build("drive", "v3", http=AuthorizedHttp(creds, http=FakeHttp()), cache_discovery=False)
+            self.create_folder(service)
+        return time.perf_counter() - start
+
+    def run_cached(self, token_path, calls):
+        google_backend.reset_google_drive_service()
+        with override_settings(GOOGLE_DRIVE_TOKEN_FILE=token_path), \
+                mock.patch.object(google_backend, "_new_http", FakeHttp):
+            start = time.perf_counter()
+            for _ in range(calls):
+                self.create_folder(google_backend.get_google_drive_service())
+            elapsed = time.perf_counter() - start
+        google_backend.reset_google_drive_service()
+        return elapsed
+
+    def handle(self, *args, **options):
+        calls = options["calls"]
+        with tempfile.TemporaryDirectory() as tmp:
+            token_path = os.path.join(tmp, "token.json")
+            _write_fake_token(token_path)
+
+            results = [
+                ("uncached", self.run_uncached(token_path, calls)),
+                ("cached", self.run_cached(token_path, calls)),
+            ]
+
+        for label, elapsed in results:
+            self.stdout.write(f"{label:>8}: {elapsed * 1000 / calls:8.3f} ms/call ({calls} calls, {elapsed:.2f}s total)")
@@ -0,0 +1,56 @@
+import tempfile
+import time
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from cases.models import Appellant, AppellantFile, DriveUploadJob
+from cases.upload_queue import process_pending
+
+
+class Command(BaseCommand):
+    help = "Compare serial and concurrent Drive uploads of one request's files against a slow fake Drive"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--files", type=int, default=8)
+        parser.add_argument("--latency", type=float, default=0.5, help="Seconds the fake Drive takes per upload")
+        parser.add_argument("--concurrency", type=int, default=4)
+
+    def run(self, appellant, count, concurrency):
+        # Rows must be committed so the pool threads' own connections can see them
+        files = [
+            # Distinct content so deduplication doesn't skip the uploads
+            AppellantFile.objects.create(
+                appellant=appellant, file=SimpleUploadedFile(f"bench-{i}.txt", f"bench {time.time()} {i}".encode())
+            )
+            for i in range(count)
+        ]
+        job_ids = list(DriveUploadJob.objects.filter(appellant_file__in=files).values_list("id", flat=True))
+
+        start = time.perf_counter()
+        process_pending(limit=count, job_ids=job_ids, concurrency=concurrency)
+        elapsed = time.perf_counter() - start
+
+        for file_obj in files:
+            file_obj.file.delete(save=False)
+        return elapsed
+
+    def handle(self, *args, **options):
+        count, latency = options["files"], options["latency"]
+        appellant = Appellant.objects.create(name="bench", email="bench@example.com", fical_code="BENCH")
+        try:
+            with tempfile.TemporaryDirectory() as root, override_settings(
+                DRIVE_UPLOADS_INLINE=False,
+                DRIVE_BACKEND="cases.drive_backends.local.LocalDriveBackend",
+                DRIVE_BACKEND_OPTIONS={"root": root, "latency": latency},
+            ):
+                results = [
+                    ("serial", self.run(appellant, count, 1)),
+                    (f"{options['concurrency']} threads", self.run(appellant, count, options["concurrency"])),
+                ]
+        finally:
+            appellant.delete()
+
+        for label, elapsed in results:
+            self.stdout.write(f"{label:>10}: {elapsed:.2f}s for {count} files ({latency}s per upload)")
@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand
+from cases.upload_queue import process_pending, requeue_failed
+
+
+class Command(BaseCommand):
+    help = "Upload queued appellant files to Google Drive"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Process one batch and exit")
+        parser.add_argument("--batch-size", type=int, default=10)
+        parser.add_argument("--concurrency", type=int, help="Parallel uploads (defaults to DRIVE_UPLOAD_CONCURRENCY)")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument("--requeue-failed", action="store_true", help="Retry jobs that ran out of attempts")
+
+    def handle(self, *args, **options):
+        if options["requeue_failed"]:
+            self.stdout.write(f"Requeued {requeue_failed()} failed job(s)")
+
+        while True:
+            jobs = process_pending(limit=options["batch_size"], concurrency=options["concurrency"])
+            for job in jobs:
+                self.stdout.write(f"job {job.id} (file {job.appellant_file_id}): {job.status}"
+                                  + (f" - {job.last_error}" if job.last_error else ""))
+
+            if options["once"]:
+                break
+            if not jobs:
+                time.sleep(options["sleep"])
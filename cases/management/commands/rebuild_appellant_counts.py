@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from cases.appellant_counts import refresh_appellant_counts
+from cases.models import Case
+
+
+class Command(BaseCommand):
+    help = "Recompute Case.appellant_count and Case.minor_count from the appellants of every case"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        updated, last_pk = 0, 0
+        while True:
+            pks = list(
+                Case.objects.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:options["batch_size"]]
+            )
+            if not pks:
+                break
+            last_pk = pks[-1]
+            updated += refresh_appellant_counts(pks)
+
+        self.stdout.write(f"Recounted the appellants of {updated} case(s)")
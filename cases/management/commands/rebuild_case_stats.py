@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from cases.case_stats import rebuild_case_stats
+
+
+class Command(BaseCommand):
+    help = "Reconcile the dashboard stats summary (CaseStat) with the cases table"
+
+    def handle(self, *args, **options):
+        fixed = rebuild_case_stats()
+        for dimension, value, (old_count, old_revenue), (new_count, new_revenue) in fixed:
+            self.stdout.write(f"{dimension} {value or '-'}: {old_count} / {old_revenue} -> {new_count} / {new_revenue}")
+        self.stdout.write(f"Fixed {len(fixed)} summary row(s)")
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from cases.models import Appellant, Case
+from cases.search import refresh_appellant_search, refresh_case_search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search vectors of every appellant and case"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def _rebuild(self, model, refresh, batch_size):
+        updated, last_pk = 0, 0
+        while True:
+            pks = list(model.objects.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                return updated
+            last_pk = pks[-1]
+            updated += refresh(pks)
+
+    def handle(self, *args, **options):
+        appellants = self._rebuild(Appellant, refresh_appellant_search, options["batch_size"])
+        cases = self._rebuild(Case, refresh_case_search, options["batch_size"])
+        self.stdout.write(f"Rebuilt the search vectors of {appellants} appellant(s) and {cases} case(s)")
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from cases.fees import get_fee_schedule, recompute_total_payments
+from cases.models import PAYMENT_STATUS, Case, FeeSchedule
+
+# Paid cases keep the total they were charged
+UNPAID_STATUSES = [value for value, _ in PAYMENT_STATUS if value != "COMPLETED"]
+
+
+class Command(BaseCommand):
+    help = "Recompute total_payment of unpaid cases from the fee schedule, without Case.save() side effects"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Report the changes without writing them")
+        parser.add_argument("--ids", type=int, nargs="+", help="Only these case ids")
+        parser.add_argument("--payment-status", nargs="+", choices=UNPAID_STATUSES,
+                            help="Only cases with these payment statuses (default: all of them)")
+        parser.add_argument("--schedule-version", type=int, help="Price with this FeeSchedule version instead of the active one")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options["schedule_version"] is not None:
+            schedule = FeeSchedule.objects.filter(version=options["schedule_version"]).first()
+            if schedule is None:
+                raise CommandError(f"No fee schedule with version {options['schedule_version']}")
+        else:
+            schedule = get_fee_schedule()
+
+        cases = Case.objects.exclude(payment_status="COMPLETED")
+        if options["payment_status"]:
+            cases = cases.filter(payment_status__in=options["payment_status"])
+        if options["ids"]:
+            cases = cases.filter(pk__in=options["ids"])
+
+        changes = recompute_total_payments(
+            cases, schedule, batch_size=options["batch_size"], dry_run=options["dry_run"]
+        )
+
+        if options["dry_run"] or options["verbosity"] > 1:
+            for pk, case_no, old_total, new_total in changes:
+                self.stdout.write(f"{case_no or pk}: {old_total} -> {new_total} ({new_total - old_total:+})")
+
+        verb = "would change" if options["dry_run"] else "changed"
+        self.stdout.write(f"{len(changes)} case total(s) {verb} under fee schedule v{schedule.version}")
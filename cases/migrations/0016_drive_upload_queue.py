@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def mark_existing_files(apps, schema_editor):
+    # Files created before the queue were uploaded inline; those without a Drive id failed
+    AppellantFile = apps.get_model('cases', 'AppellantFile')
+    AppellantFile.objects.filter(drive_file_id__isnull=False).update(sync_status='synced')
+    AppellantFile.objects.filter(drive_file_id__isnull=True).update(sync_status='failed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cases', '0015_case_drive_folder_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appellantfile',
+            name='sync_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('uploading', 'Uploading'), ('synced', 'Synced'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='DriveUploadJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('uploading', 'Uploading'), ('synced', 'Synced'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('appellant_file', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='upload_job', to='cases.appellantfile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='cases_drive_status_1c2ec8_idx')],
+            },
+        ),
+        migrations.RunPython(mark_existing_files, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cases', '0016_drive_upload_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaseDriveFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('drive_file_id', models.CharField(max_length=100)),
+                ('appellant_file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='case_copies', to='cases.appellantfile')),
+                ('case', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='drive_files', to='cases.case')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('case', 'appellant_file'), name='unique_case_drive_file')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cases', '0017_casedrivefile'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='appellantfile',
+            name='file',
+            field=models.FileField(blank=True, upload_to='temp_files/'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cases', '0018_alter_appellantfile_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appellantfile',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:29
+
+import cases.models
+from django.db import migrations, models
+
+
+def seed_current_prices(apps, schema_editor):
+    # Version 1 is the price list that used to be hard-coded in Case.calculate_total_payment
+    FeeSchedule = apps.get_model('cases', 'FeeSchedule')
+    FeeSchedule.objects.get_or_create(version=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cases', '0019_appellantfile_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeeSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('version', models.PositiveIntegerField(unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('base_amounts', models.JSONField(default=cases.models.default_base_amounts)),
+                ('fallback_base_amount', models.DecimalField(decimal_places=2, default=7500, max_digits=10)),
+                ('adult_fee', models.DecimalField(decimal_places=2, default=600, max_digits=10)),
+                ('registration_fee', models.DecimalField(decimal_places=2, default=200, max_digits=10)),
+                ('registration_number_fee', models.DecimalField(decimal_places=2, default=350, max_digits=10)),
+                ('large_group_registration_number_fee', models.DecimalField(decimal_places=2, default=500, max_digits=10)),
+                ('large_group_size', models.PositiveIntegerField(default=7)),
+                ('hearing_expenses', models.DecimalField(decimal_places=2, default=350, max_digits=10)),
+                ('fiscal_stamp', models.DecimalField(decimal_places=2, default=27, max_digits=10)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(seed_current_prices, migrations.RunPython.noop),
+    ]
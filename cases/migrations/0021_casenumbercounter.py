@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:34
+
+import re
+from django.db import migrations, models
+
+
+def seed_counters(apps, schema_editor):
+    # Start every year's counter after the highest A-YY-NNNN number already in use
+    Case = apps.get_model('cases', 'Case')
+    CaseNumberCounter = apps.get_model('cases', 'CaseNumberCounter')
+    highest = {}
+    for case_no in Case.objects.filter(case_no__startswith='A-').values_list('case_no', flat=True).iterator():
+        match = re.match(r'^A-(\d{2})-(\d+)$', case_no)
+        if match:
+            year = 2000 + int(match.group(1))
+            highest[year] = max(highest.get(year, 0), int(match.group(2)))
+    CaseNumberCounter.objects.bulk_create(
+        [CaseNumberCounter(year=year, last_number=last_number) for year, last_number in highest.items()]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cases', '0020_feeschedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaseNumberCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField(unique=True)),
+                ('last_number', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:35
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_appellants(apps, schema_editor):
+    Case = apps.get_model('cases', 'Case')
+    CaseAppellant = Case.appellants.through
+
+    def count(**filters):
+        rows = (
+            CaseAppellant.objects.filter(case_id=OuterRef('pk'), **filters)
+            .order_by().values('case_id').annotate(total=Count('*')).values('total')
+        )
+        return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+    Case.objects.update(appellant_count=count(), minor_count=count(appellant__is_minor=True))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cases', '0021_casenumbercounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='case',
+            name='appellant_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='case',
+            name='minor_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_appellants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cases', '0023_case_pagination_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appellant',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
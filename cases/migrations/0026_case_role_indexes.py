@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cases', '0025_casesetupjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(condition=models.Q(('payment_status', 'COMPLETED')), fields=['created_at', 'id'], name='case_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(condition=models.Q(('payment_status', 'COMPLETED')), fields=['lawyer', 'created_at', 'id'], name='case_lawyer_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(fields=['created_by', 'created_at', 'id'], name='case_created_by_idx'),
+        ),
+    ]
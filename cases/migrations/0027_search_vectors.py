@@ -0,0 +1,62 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:47
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Concat
+
+
+def fill_search_vectors(apps, schema_editor):
+    # Same vectors as cases.search builds; filled before the GIN indexes so those are built once
+    Appellant = apps.get_model('cases', 'Appellant')
+    Case = apps.get_model('cases', 'Case')
+    CaseAppellant = Case.appellants.through
+
+    Appellant.objects.update(
+        search_vector=SearchVector('name', 'fical_code', weight='A', config='simple')
+        + SearchVector('email', weight='B', config='simple')
+    )
+    appellants = (
+        CaseAppellant.objects.filter(case_id=OuterRef('pk'))
+        .order_by().values('case_id')
+        .annotate(text=StringAgg(Concat('appellant__name', Value(' '), 'appellant__fical_code'), ' '))
+        .values('text')
+    )
+    Case.objects.update(
+        search_vector=SearchVector('case_no', 'court_no', 'descendant', weight='A', config='simple')
+        + SearchVector(Subquery(appellants, output_field=TextField()), weight='B', config='simple')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cases', '0026_case_role_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appellant',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='case',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_search_vectors, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='appellant',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='appellant_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='case_search_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:47
+
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cases', '0027_search_vectors'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='appellant',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='appellant_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['descendant'], name='case_descendant_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
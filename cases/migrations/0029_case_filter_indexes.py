@@ -0,0 +1,35 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cases', '0028_trigram_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(condition=models.Q(('payment_status', 'COMPLETED')), fields=['status', 'created_at', 'id'], name='case_status_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(fields=['payment_status', 'created_at', 'id'], name='case_payment_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(condition=models.Q(('date_of_payment__isnull', False)), fields=['date_of_payment'], name='case_date_of_payment_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(condition=models.Q(('is_judicial', True)), fields=['created_at', 'id'], name='case_judicial_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(condition=models.Q(('is_consolare', True)), fields=['created_at', 'id'], name='case_consolare_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:51
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_case_stats(apps, schema_editor):
+    Case = apps.get_model('cases', 'Case')
+    CaseStat = apps.get_model('cases', 'CaseStat')
+
+    totals = Case.objects.aggregate(case_count=Count('pk'), revenue=Sum('total_payment'))
+    stats = [CaseStat(dimension='total', value='', case_count=totals['case_count'], revenue=totals['revenue'] or 0)]
+    for dimension, field in (('status', 'status'), ('payment_status', 'payment_status'), ('lawyer', 'lawyer_id')):
+        for row in Case.objects.order_by().values(field).annotate(case_count=Count('pk'), revenue=Sum('total_payment')):
+            value = '' if row[field] is None else str(row[field])
+            stats.append(CaseStat(dimension=dimension, value=value, case_count=row['case_count'], revenue=row['revenue'] or 0))
+    CaseStat.objects.bulk_create(stats)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cases', '0029_case_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaseStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('total', 'Total'), ('status', 'Status'), ('payment_status', 'Payment status'), ('lawyer', 'Lawyer')], max_length=20)),
+                ('value', models.CharField(blank=True, max_length=100)),
+                ('case_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'value'), name='unique_case_stat')],
+            },
+        ),
+        migrations.RunPython(fill_case_stats, migrations.RunPython.noop),
+    ]
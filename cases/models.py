@@ -1,11 +1,13 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.utils import timezone
 from users.models import TimestampedModel, CustomUser
 # from .google_drive_service import create_drive_folder
-from .google_drive_service import upload_to_drive, create_drive_folder, copy_file_to_folder
-import datetime
-from django.db.models import Max
+from .google_drive_service import ensure_case_drive_folder
+from .upload_handlers import compute_content_hash
+from decimal import Decimal
 import os
-from django.shortcuts import get_object_or_404
 from dotenv import load_dotenv
 
 load_dotenv() 
@@ -39,6 +41,20 @@ CASE_STATUS = (
     ('Transcript Of Proceedings (Municipality)', 'Transcript Of Proceedings (Municipality)')
 )
 
+SYNC_STATUS = (
+    ('pending', 'Pending'),
+    ('uploading', 'Uploading'),
+    ('synced', 'Synced'),
+    ('failed', 'Failed'),
+)
+
+SETUP_STATUS = (
+    ('pending', 'Pending'),
+    ('running', 'Running'),
+    ('done', 'Done'),
+    ('failed', 'Failed'),
+)
+
 PAYMENT_STATUS = (
     ('COMPLETED', 'COMPLETED'),
     ('PENDING', 'PENDING'),
@@ -58,6 +74,16 @@ class Appellant(models.Model):
     address = models.TextField(blank=True, null=True)
     marital_status = models.CharField(max_length=20, choices=MARITAL_STATUS_CHOICES, null=True, blank=True)
     drive_folder_id = models.CharField(max_length=100, blank=True, null=True)  # Store Drive Folder ID
+    updated_at = models.DateTimeField(auto_now=True)  # Also bumped when its files change, for ETags
+    # Kept current by cases.signals; rebuild with `manage.py rebuild_search_vectors`
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="appellant_search_idx"),
+            # Fuzzy name matching (pg_trgm)
+            GinIndex(fields=["name"], opclasses=["gin_trgm_ops"], name="appellant_name_trgm_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         # if not self.drive_folder_id:
@@ -68,31 +94,117 @@ class Appellant(models.Model):
 
 class AppellantFile(models.Model):
     appellant = models.ForeignKey("Appellant", on_delete=models.CASCADE, related_name="files")
-    file = models.FileField(upload_to="temp_files/")  # Temporarily store before upload
+    file = models.FileField(upload_to="temp_files/", blank=True)  # Empty unless DRIVE_KEEP_LOCAL_COPY is set
     drive_file_id = models.CharField(max_length=100, blank=True, null=True)
     drive_file_link = models.URLField(blank=True, null=True)
+    sync_status = models.CharField(max_length=20, choices=SYNC_STATUS, default="pending")
+    content_hash = models.CharField(max_length=64, blank=True, null=True, db_index=True)  # SHA-256 of the content
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def save(self, *args, **kwargs):
-        # First save to generate file path
-        is_new = self._state.adding
+        # Hash new local uploads before they are written to storage
+        if not self.content_hash and self.file and not self.file._committed:
+            self.content_hash = compute_content_hash(self.file)
         super().save(*args, **kwargs)
 
-        # Only handle upload logic when newly created (is_new)
-        if is_new:
-            # Upload the file to Google Drive regardless of the environment
-            drive_file_id, drive_link = upload_to_drive(
-                self.appellant.drive_folder_id,  # Appellant's Google Drive folder ID
-                self.file.path,  # Local file path
-                self.file.name  # The name of the file
-            )
+    def find_uploaded_duplicate(self):
+        """Another file with the same content that already lives on Drive, if any"""
+        if not self.content_hash:
+            return None
+        return (
+            AppellantFile.objects.filter(content_hash=self.content_hash, drive_file_id__isnull=False)
+            .exclude(pk=self.pk)
+            .exclude(drive_file_id="")
+            .order_by("pk")
+            .first()
+        )
+
+
+class DriveUploadJob(TimestampedModel):
+    """A queued upload of an AppellantFile to Google Drive, processed by `manage.py process_upload_jobs`"""
+    appellant_file = models.OneToOneField(AppellantFile, on_delete=models.CASCADE, related_name="upload_job")
+    status = models.CharField(max_length=20, choices=SYNC_STATUS, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+
+def default_base_amounts():
+    return {
+        "1": 2500, "2": 2500, "3": 3000, "4": 3500, "5": 4000, "6": 4500,
+        "7": 5000, "8": 5500, "9": 6000, "10": 6500, "11": 7000, "12": 7500,
+    }
+
+
+class FeeSchedule(TimestampedModel):
+    """A version of the case price list; the active one with the highest version prices new cases"""
+    version = models.PositiveIntegerField(unique=True)
+    is_active = models.BooleanField(default=True)
+    # {"<number of appellants>": amount}; head counts without an entry pay fallback_base_amount
+    base_amounts = models.JSONField(default=default_base_amounts)
+    fallback_base_amount = models.DecimalField(max_digits=10, decimal_places=2, default=7500)
+    adult_fee = models.DecimalField(max_digits=10, decimal_places=2, default=600)
+    registration_fee = models.DecimalField(max_digits=10, decimal_places=2, default=200)
+    # Per appellant; groups of large_group_size or more pay the large group rate
+    registration_number_fee = models.DecimalField(max_digits=10, decimal_places=2, default=350)
+    large_group_registration_number_fee = models.DecimalField(max_digits=10, decimal_places=2, default=500)
+    large_group_size = models.PositiveIntegerField(default=7)
+    hearing_expenses = models.DecimalField(max_digits=10, decimal_places=2, default=350)
+    fiscal_stamp = models.DecimalField(max_digits=10, decimal_places=2, default=27)
+
+    def quote(self, adults, minors):
+        """Total payment for a case with the given number of adult and minor appellants"""
+        people = adults + minors
+        base_amount = Decimal(self.base_amounts.get(str(people), self.fallback_base_amount))
+        if people < self.large_group_size:
+            registration_number_fee = people * self.registration_number_fee
+        else:
+            registration_number_fee = people * self.large_group_registration_number_fee
+        return (
+            base_amount + adults * self.adult_fee + self.registration_fee + registration_number_fee
+            + self.hearing_expenses + self.fiscal_stamp
+        )
+
+    def __str__(self):
+        return f"Fee schedule v{self.version}"
+
+
+class CaseNumberCounter(models.Model):
+    """Last case number handed out in a year; see cases.case_numbers"""
+    year = models.PositiveIntegerField(unique=True)
+    last_number = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.year}: {self.last_number}"
+
+
+CASE_STAT_DIMENSIONS = (
+    ('total', 'Total'),
+    ('status', 'Status'),
+    ('payment_status', 'Payment status'),
+    ('lawyer', 'Lawyer'),
+)
 
-            # Update model fields with the file info from Google Drive
-            self.drive_file_id = drive_file_id
-            self.drive_file_link = drive_link
 
-            # Save the updates with Google Drive information
-            super().save(update_fields=["drive_file_id", "drive_file_link"])
+class CaseStat(models.Model):
+    """Running case count and total_payment sum per status, payment status and lawyer; see cases.case_stats"""
+    dimension = models.CharField(max_length=20, choices=CASE_STAT_DIMENSIONS)
+    value = models.CharField(max_length=100, blank=True)  # status, payment status or lawyer id; "" for none
+    case_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["dimension", "value"], name="unique_case_stat"),
+        ]
+
+    def __str__(self):
+        return f"{self.dimension} {self.value}: {self.case_count} / {self.revenue}"
 
 
 class Address(TimestampedModel):
@@ -108,6 +220,9 @@ class Case(TimestampedModel):
     court_no = models.CharField(max_length=100, blank=True, null=True)
     case_no = models.CharField(max_length=100, blank=True, null=True, unique=True)
     appellants = models.ManyToManyField(Appellant, related_name="cases")  # M2M Relationship
+    # Kept in step with `appellants` by cases.signals; rebuild with `manage.py rebuild_appellant_counts`
+    appellant_count = models.PositiveIntegerField(default=0)
+    minor_count = models.PositiveIntegerField(default=0)
     lawyer = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, related_name="cases", null=True, blank=True)
     descendant = models.CharField(max_length=100, blank=True, null=True)
     des_birth_place = models.CharField(max_length=100, blank=True, null=True)
@@ -135,111 +250,102 @@ class Case(TimestampedModel):
     date_of_payment = models.DateField(null=True, blank=True)
     drive_folder_id = models.CharField(max_length=100, blank=True, null=True) 
     created_by = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='created_cases')
+    # case_no, court_no, descendant and the appellants' names and fiscal codes; kept current by cases.signals
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Cursor pagination order
+            models.Index(fields=["created_at", "id"]),
+            # One per branch of cases.querysets.cases_visible_to, each in cursor order
+            models.Index(
+                fields=["created_at", "id"], condition=models.Q(payment_status="COMPLETED"), name="case_completed_idx",
+            ),
+            models.Index(
+                fields=["lawyer", "created_at", "id"], condition=models.Q(payment_status="COMPLETED"),
+                name="case_lawyer_completed_idx",
+            ),
+            models.Index(fields=["created_by", "created_at", "id"], name="case_created_by_idx"),
+            # cases.filters.CaseFilterSet; the role indexes above cover lawyer and created_at
+            models.Index(
+                fields=["status", "created_at", "id"], condition=models.Q(payment_status="COMPLETED"),
+                name="case_status_completed_idx",
+            ),
+            models.Index(fields=["payment_status", "created_at", "id"], name="case_payment_status_idx"),
+            models.Index(
+                fields=["date_of_payment"], condition=models.Q(date_of_payment__isnull=False),
+                name="case_date_of_payment_idx",
+            ),
+            models.Index(fields=["created_at", "id"], condition=models.Q(is_judicial=True), name="case_judicial_idx"),
+            models.Index(fields=["created_at", "id"], condition=models.Q(is_consolare=True), name="case_consolare_idx"),
+            GinIndex(fields=["search_vector"], name="case_search_idx"),
+            GinIndex(fields=["descendant"], opclasses=["gin_trgm_ops"], name="case_descendant_trgm_idx"),
+        ]
 
     def calculate_total_payment(self):
-        # Assuming you are passing the list of appellant IDs as part of the payload
-        appellant_ids = self.appellants.all()  # This would already be a queryset from the DB
-
-        minors = 0
-        adults = 0
-
-        # Loop through the appellant IDs and check their 'is_minor' field
-        for appellant_id in appellant_ids:
-            appellant = get_object_or_404(Appellant, id=appellant_id.id)
-            if appellant.is_minor:
-                minors += 1
-            else:
-                adults += 1
-        # Total people calculation
-        total_people = minors + adults
-
-        # Base amount based on the total number of people
-        if total_people == 1:
-            base_amount = 2500
-        elif total_people == 2:
-            base_amount = 2500
-        elif total_people == 3:
-            base_amount = 3000
-        elif total_people == 4:
-            base_amount = 3500
-        elif total_people == 5:
-            base_amount = 4000
-        elif total_people == 6:
-            base_amount = 4500
-        elif total_people == 7:
-            base_amount = 5000
-        elif total_people == 8:
-            base_amount = 5500
-        elif total_people == 9:
-            base_amount = 6000
-        elif total_people == 10:
-            base_amount = 6500
-        elif total_people == 11:
-            base_amount = 7000
-        elif total_people == 12:
-            base_amount = 7500
-        else:
-            base_amount = 7500  # For more than 12 people, fallback to 7500
-        
-        # Debugging output for base amount
-
-        # Calculate additional costs
-        extra_for_adults = adults * 600  # For each adult
-        registration_fee = 200
-        registration_number_fee = total_people * 350 if total_people < 7 else 500 * total_people
-        hearing_expenses = 350
-        fiscal_stamp = 27
-
-        # Calculate total payment
-        total_payment = base_amount + extra_for_adults + registration_fee + registration_number_fee + hearing_expenses + fiscal_stamp
-
-        # Debug output for total payment
-
-        return total_payment
+        """Price of the case under the active fee schedule (see cases.fees)"""
+        from .fees import quote_case
+
+        return quote_case(self)
+
+    # Compared with their values as loaded; see changed_fields(). case_no, court_no and
+    # descendant are also cases.search.CASE_SEARCH_FIELDS
+    tracked_fields = ("case_no", "court_no", "descendant")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values) if name in cls.tracked_fields
+        }
+        return instance
+
+    def changed_fields(self):
+        """The tracked_fields that differ from the values loaded from the database (all of them for a new case)"""
+        loaded = getattr(self, "_loaded_values", {})
+        # A deferred field can't have been assigned, or it would no longer be deferred
+        deferred = self.get_deferred_fields()
+        return {
+            name for name in self.tracked_fields
+            if name not in deferred and (name not in loaded or getattr(self, name) != loaded[name])
+        }
 
     def generate_case_no(self):
-        current_year = datetime.datetime.now().year
-        year_prefix = f"A-{str(current_year)[2:4]}-"  # For example, 'A-25-'
-
-        # Find the latest case_no for the current year
-        last_case = Case.objects.filter(case_no__startswith=year_prefix).aggregate(Max('case_no'))
-        last_case_no = last_case['case_no__max']
-
-        if last_case_no:
-            # Extract the number part from the case_no
-            last_number = int(last_case_no.split('-')[-1])
-            # If the number reaches 9999, increment the year and reset number to 0000
-            if last_number == 9999:
-                new_case_no = f"{year_prefix}{str(last_number + 1).zfill(4)}"  # A-26-0000
-            else:
-                new_case_no = f"{year_prefix}{str(last_number + 1).zfill(4)}"  # Increment number
-        else:
-            # If no case exists for the year, start at 0001
-            new_case_no = f"{year_prefix}0001"
+        """Next A-YY-NNNN number of the current year, from the per-year counter"""
+        from .case_numbers import allocate_case_numbers
 
-        return new_case_no
+        return allocate_case_numbers()[0]
 
     
     def save(self, *args, **kwargs):
+        from .case_numbers import claim_case_numbers
+
+        changed = self.changed_fields()
+        if kwargs.get("update_fields") is not None:
+            changed &= set(kwargs["update_fields"])
         if not self.case_no:
             self.case_no = self.generate_case_no()
-        
+            changed.add("case_no")
+        elif "case_no" in changed:
+            # Chosen by hand: the counter must not hand the same number out later
+            claim_case_numbers([self.case_no])
+
+        if not self._state.adding and not self.drive_folder_id and not args and kwargs.get("update_fields") is None:
+            # Don't write NULL over a folder another request created since this instance was loaded
+            skipped = self.get_deferred_fields() | {"drive_folder_id"}
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+
+        # For the post_save receivers, which run before the loaded values are replaced below
+        self._changed_fields = changed
         super().save(*args, **kwargs)
+        loaded = getattr(self, "_loaded_values", {})
+        self._loaded_values = {**loaded, **{name: getattr(self, name) for name in changed}}
 
         if not self.drive_folder_id:
-            folder_id = create_drive_folder(self.case_no)
-            self.drive_folder_id = folder_id
-            super().save(update_fields=["drive_folder_id"])
-
-        # After case and folder are created, copy files into case folder
-        for appellant in self.appellants.all():
-            for file in appellant.files.all():
-                if file.drive_file_id:
-                    # Copy the file to the case's drive folder
-                    copied_file_id, copied_file_link = copy_file_to_folder(
-                        file.drive_file_id,
-                        self.drive_folder_id
-                    )
+            ensure_case_drive_folder(self)
 
     def __str__(self):
         return self.case_no
@@ -249,4 +355,30 @@ class Case(TimestampedModel):
 class Generation(TimestampedModel):
     case = models.ForeignKey(Case, on_delete=models.CASCADE, related_name="generations")
     number = models.PositiveIntegerField(null=True, blank=True)
-    desc = models.TextField(null=True, blank=True)
\ No newline at end of file
+    desc = models.TextField(null=True, blank=True)
+
+
+class CaseDriveFile(TimestampedModel):
+    """Ledger of appellant files already copied into a case's Drive folder"""
+    case = models.ForeignKey(Case, on_delete=models.CASCADE, related_name="drive_files")
+    appellant_file = models.ForeignKey(AppellantFile, on_delete=models.CASCADE, related_name="case_copies")
+    drive_file_id = models.CharField(max_length=100)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["case", "appellant_file"], name="unique_case_drive_file"),
+        ]
+
+
+class CaseSetupJob(TimestampedModel):
+    """Drive folder, file copies and appellant email of a bulk-created case, run by `manage.py process_case_jobs`"""
+    case = models.OneToOneField(Case, on_delete=models.CASCADE, related_name="setup_job")
+    status = models.CharField(max_length=20, choices=SETUP_STATUS, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
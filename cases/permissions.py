@@ -51,4 +51,11 @@ class RevisionCasePermission(permissions.BasePermission):
         if user.role in ['super_admin', 'admin']:
             return True
 
-        return False
\ No newline at end of file
+        return False
+
+
+class IsAdminRolePermission(permissions.BasePermission):
+    """Only super_admin and admin users"""
+
+    def has_permission(self, request, view):
+        return request.user.role in ['super_admin', 'admin']
@@ -0,0 +1,63 @@
+from django.db.models import Exists, OuterRef, Prefetch
+from .models import Appellant, AppellantFile, Case, Generation
+
+
+def cases_visible_to(user, cases=None):
+    """The cases `user` may see, by role; every branch is a plain filter on `cases`, so no row comes back twice"""
+    cases = Case.objects.all() if cases is None else cases
+    if user.role in ['super_admin', 'admin']:
+        return cases.filter(payment_status="COMPLETED")
+    if user.role == "customer":
+        # EXISTS instead of joining appellants, which repeats a case for each of the user's appellants in it
+        own_appellants = Case.appellants.through.objects.filter(case_id=OuterRef("pk"), appellant__user=user)
+        return cases.filter(Exists(own_appellants), payment_status="COMPLETED")
+    if user.role == "external_lawyer":
+        return cases.filter(created_by=user)
+    return cases.filter(lawyer=user, payment_status="COMPLETED")
+
+
+def with_appellant_details(appellants, serializer=None):
+    """Load what AppellantSerializer renders; with a (sparse) serializer, only what that one renders"""
+    files = Prefetch("files", queryset=AppellantFile.objects.order_by("pk"))
+    if serializer is None:
+        return appellants.prefetch_related(files)
+
+    if "files" in serializer.fields:
+        appellants = appellants.prefetch_related(files)
+    if "user" in serializer.expand:
+        appellants = appellants.select_related("user")
+    return appellants.only(*serializer.model_columns())
+
+
+def with_case_details(cases, serializer=None):
+    """Load everything CaseSerializer renders, in a fixed number of queries however many cases there are.
+
+    Given the (sparse) serializer of the request, only its columns, joins and prefetches are loaded.
+    """
+    if serializer is None:
+        return cases.select_related(
+            "lawyer", "created_by", "marriage_place", "grand_parents_dop",
+        ).prefetch_related(
+            Prefetch("appellants", queryset=with_appellant_details(Appellant.objects.all())),
+            Prefetch("generations", queryset=Generation.objects.order_by("pk")),
+        )
+
+    names, expand = set(serializer.fields), serializer.expand
+    related = [name for name in ("marriage_place", "grand_parents_dop") if name in names]
+    related += [name for name in ("lawyer", "created_by") if name in expand]
+
+    prefetches = []
+    if "appellants" in names:
+        if "appellants" in expand:
+            appellants = with_appellant_details(
+                Appellant.objects.all(), serializer.nested_serializer("appellants").child
+            )
+        else:
+            appellants = Appellant.objects.only("id")
+        prefetches.append(Prefetch("appellants", queryset=appellants))
+    if "generations" in names:
+        prefetches.append(Prefetch("generations", queryset=Generation.objects.order_by("pk")))
+
+    # created_at is the cursor pagination key
+    columns = serializer.model_columns() | {"created_at"}
+    return cases.select_related(*related).prefetch_related(*prefetches).only(*columns)
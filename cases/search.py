@@ -0,0 +1,90 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db.models import Exists, F, FloatField, OuterRef, Q, Subquery, TextField, Value
+from django.db.models.functions import Coalesce, Concat, Greatest
+from .models import Appellant, Case
+
+CaseAppellant = Case.appellants.through
+
+# Names and codes, so no stemming or stop words
+SEARCH_CONFIG = "simple"
+
+# Fields whose change means the search vectors must be rebuilt
+APPELLANT_SEARCH_FIELDS = {"name", "fical_code", "email"}
+CASE_SEARCH_FIELDS = {"case_no", "court_no", "descendant"}
+
+
+def _appellant_vector():
+    return (
+        SearchVector("name", "fical_code", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("email", weight="B", config=SEARCH_CONFIG)
+    )
+
+
+def _case_vector():
+    # Every appellant's name and fiscal code, so a case is found by any of its appellants
+    appellants = (
+        CaseAppellant.objects.filter(case_id=OuterRef("pk"))
+        .order_by()
+        .values("case_id")
+        .annotate(text=StringAgg(Concat("appellant__name", Value(" "), "appellant__fical_code"), " "))
+        .values("text")
+    )
+    return (
+        SearchVector("case_no", "court_no", "descendant", weight="A", config=SEARCH_CONFIG)
+        + SearchVector(Subquery(appellants, output_field=TextField()), weight="B", config=SEARCH_CONFIG)
+    )
+
+
+def refresh_appellant_search(appellant_ids):
+    """Rebuild search_vector of the given appellants in one UPDATE"""
+    return Appellant.objects.filter(pk__in=appellant_ids).update(search_vector=_appellant_vector())
+
+
+def refresh_case_search(case_ids):
+    """Rebuild search_vector of the given cases, appellant names included, in one UPDATE"""
+    return Case.objects.filter(pk__in=case_ids).update(search_vector=_case_vector())
+
+
+def _query(terms):
+    return SearchQuery(terms, search_type="websearch", config=SEARCH_CONFIG)
+
+
+def _score(rank, similarity):
+    # A row found through one index only can have NULL for the other part
+    return Coalesce(rank, Value(0.0), output_field=FloatField()) + Coalesce(similarity, Value(0.0), output_field=FloatField())
+
+
+def search_appellants(appellants, terms):
+    """Appellants matching `terms` in name, fiscal code or email, or close to them in name; best first"""
+    query = _query(terms)
+    return (
+        appellants.filter(Q(search_vector=query) | Q(name__trigram_word_similar=terms))
+        .annotate(rank=_score(SearchRank(F("search_vector"), query), TrigramWordSimilarity(terms, "name")))
+        .order_by("-rank", "-id")
+    )
+
+
+def search_cases(cases, terms):
+    """Cases matching `terms` in case_no, court_no, descendant or an appellant's name or fiscal code,
+    or close to them in descendant or appellant name; best first"""
+    query = _query(terms)
+    # An appellant of the case whose name is close to `terms` (appellant_name_trgm_idx)
+    appellant_match = CaseAppellant.objects.filter(case_id=OuterRef("pk"), appellant__name__trigram_word_similar=terms)
+    closest_appellant = (
+        CaseAppellant.objects.filter(case_id=OuterRef("pk"))
+        .annotate(similarity=TrigramWordSimilarity(terms, "appellant__name"))
+        .order_by("-similarity")
+        .values("similarity")[:1]
+    )
+    # GREATEST skips NULLs: a case without appellants is ranked by its descendant alone
+    similarity = Greatest(
+        TrigramWordSimilarity(terms, "descendant"), Subquery(closest_appellant, output_field=FloatField())
+    )
+    return (
+        cases.filter(
+            Q(search_vector=query) | Q(descendant__trigram_word_similar=terms) | Exists(appellant_match)
+        )
+        .annotate(rank=_score(SearchRank(F("search_vector"), query), similarity))
+        .order_by("-rank", "-id")
+    )
@@ -11,17 +11,49 @@ from users.models import (
     UserRoles
     )
 from users.serializers import UserSerializer
+from digymarketing.serializers import SparseFieldsetMixin
+from . import google_drive_service
+from .upload_handlers import DriveUploadedFile
+from .services import upsert_generations
 
 
 
 class AppellantFileSerializer(serializers.ModelSerializer):
     class Meta:
         model = AppellantFile
-        fields = ['id', 'appellant', 'file', 'drive_file_link', 'uploaded_at']
-        read_only_fields = ['uploaded_at']
+        fields = ['id', 'appellant', 'file', 'drive_file_link', 'sync_status', 'uploaded_at']
+        read_only_fields = ['drive_file_link', 'sync_status', 'uploaded_at']
 
+    def validate_file(self, value):
+        if isinstance(value, DriveUploadedFile) and not value.drive_file_id and not value.has_local_copy:
+            raise serializers.ValidationError(f"Upload to Google Drive failed: {value.upload_error}")
+        return value
 
-class AppellantSerializer(serializers.ModelSerializer):
+    def create(self, validated_data):
+        file = validated_data.get('file')
+        if isinstance(file, DriveUploadedFile):
+            validated_data['content_hash'] = file.content_hash
+
+        if isinstance(file, DriveUploadedFile) and file.drive_file_id:
+            drive_file_id, drive_file_link = file.drive_file_id, file.drive_file_link
+            duplicate = AppellantFile(content_hash=file.content_hash).find_uploaded_duplicate()
+            if duplicate:
+                # Same document is already on Drive; keep that copy and drop the one just streamed
+                google_drive_service.delete_drive_file(drive_file_id)
+                # Already gone; nothing for the view to clean up if this save is rolled back
+                file.drive_file_id = None
+                drive_file_id, drive_file_link = duplicate.drive_file_id, duplicate.drive_file_link
+
+            # Already on Drive, nothing left for the upload queue to do
+            validated_data['drive_file_id'] = drive_file_id
+            validated_data['drive_file_link'] = drive_file_link
+            validated_data['sync_status'] = 'synced'
+            if not file.has_local_copy:
+                validated_data['file'] = None
+        return super().create(validated_data)
+
+
+class AppellantSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     files = AppellantFileSerializer(many=True, read_only=True)
     password = serializers.CharField(write_only=True, required=False)
     user = serializers.PrimaryKeyRelatedField(read_only=True)
@@ -34,6 +66,8 @@ class AppellantSerializer(serializers.ModelSerializer):
             'drive_folder_id', 'files', 'password', 'user'
         ]
 
+    expandable_fields = {'user': (UserSerializer, False)}
+
 class AddressSerializer(serializers.ModelSerializer):
     class Meta:
         model = Address
@@ -48,18 +82,47 @@ class GenerationSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class CaseSerializer(serializers.ModelSerializer):
-    appellants = serializers.PrimaryKeyRelatedField(queryset=Appellant.objects.all(), many=True)
-    lawyer = serializers.PrimaryKeyRelatedField(queryset=CustomUser.objects.all(), allow_null=True)
+class CaseGenerationSerializer(GenerationSerializer):
+    """Generation nested in a case; an `id` in the input updates that generation"""
+    id = serializers.IntegerField(required=False)
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Takes the instance from context['prefetched'][model] when it is there instead of querying for it"""
+
+    def to_internal_value(self, data):
+        prefetched = self.context.get('prefetched', {}).get(self.get_queryset().model)
+        if prefetched and not isinstance(data, bool):
+            try:
+                instance = prefetched.get(int(data))
+            except (TypeError, ValueError):
+                instance = None
+            if instance is not None:
+                return instance
+        return super().to_internal_value(data)
+
+
+class CaseSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    appellants = PrefetchedPrimaryKeyRelatedField(queryset=Appellant.objects.all(), many=True)
+    lawyer = PrefetchedPrimaryKeyRelatedField(queryset=CustomUser.objects.all(), allow_null=True)
 
     marriage_place = AddressSerializer(required=False)
     grand_parents_dop = AddressSerializer(required=False)
-    generations = GenerationSerializer(many=True, required=False)  # ✅ renamed to `generations`
-    created_by = serializers.PrimaryKeyRelatedField(queryset=CustomUser.objects.all(), required=False)
+    generations = CaseGenerationSerializer(many=True, required=False)  # ✅ renamed to `generations`
+    created_by = PrefetchedPrimaryKeyRelatedField(queryset=CustomUser.objects.all(), required=False)
 
     class Meta:
         model = Case
-        fields = "__all__"
+        exclude = ['search_vector']
+        read_only_fields = ['appellant_count', 'minor_count']
+
+    # Written as ids, rendered as nested objects unless ?expand= says otherwise
+    expandable_fields = {
+        'appellants': (AppellantSerializer, True),
+        'lawyer': (UserSerializer, False),
+        'created_by': (UserSerializer, False),
+    }
+    default_expand = ('appellants', 'lawyer', 'created_by')
 
     def create(self, validated_data):
         request = self.context.get('request')
@@ -88,8 +151,10 @@ class CaseSerializer(serializers.ModelSerializer):
         case.save()
 
         # Create related generations
-        for gen_data in generations_data:
-            Generation.objects.create(case=case, **gen_data)
+        Generation.objects.bulk_create([
+            Generation(case=case, **{key: value for key, value in gen_data.items() if key != 'id'})
+            for gen_data in generations_data
+        ])
 
         return case
 
@@ -115,11 +180,9 @@ class CaseSerializer(serializers.ModelSerializer):
             else:
                 instance.grand_parents_dop = Address.objects.create(**grand_parents_dop_data)
 
-        # Handle generations: delete old ones and recreate
+        # Handle generations: update matching rows, add new ones, drop the rest
         if generations_data is not None:
-            instance.generations.all().delete()
-            for gen_data in generations_data:
-                Generation.objects.create(case=instance, **gen_data)
+            upsert_generations(instance, generations_data)
 
         for key, value in validated_data.items():
             setattr(instance, key, value)
@@ -132,19 +195,11 @@ class CaseSerializer(serializers.ModelSerializer):
 
         return instance
 
-    def to_representation(self, instance):
-        """Customize the representation of CaseSerializer"""
-        data = super().to_representation(instance)
-        
-        # Convert appellants from IDs to serialized objects
-        data['appellants'] = AppellantSerializer(instance.appellants.all(), many=True).data
-        
-        # Convert lawyer from ID to serialized object
-        if instance.lawyer:
-            data['lawyer'] = UserSerializer(instance.lawyer).data
-        
-        # Convert created_by from ID to serialized object
-        if instance.created_by:
-            data['created_by'] = UserSerializer(instance.created_by).data
-
-        return data
\ No newline at end of file
+
+class CaseListSerializer(CaseSerializer):
+    """Compact default for the case list; ?fields= / ?expand= still reach every CaseSerializer field"""
+    default_fields = [
+        'id', 'case_no', 'status', 'payment_status', 'total_payment', 'lawyer',
+        'appellant_count', 'minor_count', 'created_at', 'updated_at',
+    ]
+    default_expand = ('lawyer',)
@@ -2,8 +2,15 @@ import random
 import string
 from django.conf import settings
 from django.core.mail import send_mail
+from django.db import transaction
+from django.utils import timezone
 from users.models import CustomUser, UserRoles
-from .models import Appellant
+from .case_numbers import allocate_case_numbers, claim_case_numbers
+from .case_stats import apply_stats_changes, stat_row
+from .fees import get_fee_schedule
+from .freshness import touch_cases
+from .models import Address, Appellant, Case, CaseSetupJob, Generation
+from .search import refresh_case_search
 
 def create_appellant_with_user(appellant_data):
     password = appellant_data.pop("password", None)
@@ -21,3 +28,164 @@ def create_appellant_with_user(appellant_data):
 
     # Return password for optional use
     return appellant, password
+
+
+def link_first_appellant_user(case):
+    """Link the case's first appellant to a customer account and email them about the case (only once)"""
+    appellants = case.appellants.all()
+
+    if appellants.exists():
+        first_appellant = appellants.first()
+
+        if not first_appellant.user:
+            # Try to find an existing user by email
+            existing_user = CustomUser.objects.filter(email=first_appellant.email).first()
+
+            if existing_user:
+                # Link existing user to appellant
+                first_appellant.user = existing_user
+                first_appellant.save()
+
+                # Send email to notify case assignment (no password)
+                subject = "You have been assigned to a new case"
+                message = (
+                    f"Hello {existing_user.first_name},\n\n"
+                    f"You have been assigned to a new case.\n"
+                    f"Email: {existing_user.email}\n"
+                    f"Role: {existing_user.role}\n\n"
+                    f"You can log in with your existing credentials."
+                )
+            else:
+                # Create a new user and assign it
+                temp_password = "".join(random.choices(string.ascii_letters + string.digits, k=10))
+                user = CustomUser.objects.create_user(
+                    email=first_appellant.email,
+                    password=temp_password,
+                    role=UserRoles.CUSTOMER,
+                    first_name=first_appellant.name
+                )
+                first_appellant.user = user
+                first_appellant.save()
+
+                subject = "Your Case Access Credentials"
+                message = (
+                    f"Hello {user.first_name},\n\n"
+                    f"You have been assigned to a new case.\n"
+                    f"Email: {user.email}\n"
+                    f"Role: {user.role}\n"
+                    f"Temporary Password: {temp_password}\n\n"
+                    f"Please change your password after logging in."
+                )
+
+            # Send email
+            try:
+                send_mail(
+                    subject=subject,
+                    message=message,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    recipient_list=[first_appellant.email],
+                    fail_silently=False,
+                )
+            except Exception as e:
+                print(f"Failed to send case email: {e}")
+
+
+def upsert_generations(case, generations_data):
+    """Make the case's generations match `generations_data` with one bulk_update, bulk_create and delete.
+
+    Incoming rows are matched to existing ones by id, then by number; unmatched existing rows are removed.
+    """
+    existing = list(case.generations.all())
+    by_id = {generation.pk: generation for generation in existing}
+    by_number = {}
+    for generation in existing:
+        by_number.setdefault(generation.number, generation)
+
+    matched, changed, created = set(), [], []
+    now = timezone.now()
+    for data in generations_data:
+        data = dict(data)
+        generation = by_id.get(data.pop('id', None))
+        if generation is None and data.get('number') is not None:
+            generation = by_number.get(data['number'])
+        if generation is None or generation.pk in matched:
+            created.append(Generation(case=case, **data))
+            continue
+
+        matched.add(generation.pk)
+        if any(getattr(generation, key) != value for key, value in data.items()):
+            for key, value in data.items():
+                setattr(generation, key, value)
+            generation.updated_at = now  # bulk_update skips auto_now
+            changed.append(generation)
+
+    removed = [generation.pk for generation in existing if generation.pk not in matched]
+    with transaction.atomic():
+        if removed:
+            Generation.objects.filter(pk__in=removed).delete()
+        if changed:
+            Generation.objects.bulk_update(changed, ['number', 'desc', 'updated_at'])
+        if created:
+            Generation.objects.bulk_create(created)
+    if removed or changed or created:
+        touch_cases([case.pk])
+
+
+def bulk_create_cases(items, created_by=None):
+    """Create cases from validated CaseSerializer data with one INSERT per table.
+
+    Skips Case.save() and the m2m signals: case numbers are reserved in one go, the appellant counts,
+    totals, search vectors and dashboard stats are filled in here, and the Drive folder, file copies and appellant email are left to
+    a CaseSetupJob per case (`manage.py process_case_jobs`).
+    """
+    items = [dict(item) for item in items]
+    schedule = get_fee_schedule()
+
+    with transaction.atomic():
+        claim_case_numbers([item.get('case_no') for item in items])
+        case_numbers = iter(allocate_case_numbers(sum(1 for item in items if not item.get('case_no'))))
+
+        addresses = []
+        for item in items:
+            for key in ('marriage_place', 'grand_parents_dop'):
+                if item.get(key):
+                    item[key] = Address(**item[key])
+                    addresses.append(item[key])
+                else:
+                    item.pop(key, None)
+        Address.objects.bulk_create(addresses)
+
+        cases, appellants, generations = [], [], []
+        for item in items:
+            # Same de-duplication as case.appellants.set()
+            case_appellants = list({appellant.pk: appellant for appellant in item.pop('appellants', [])}.values())
+            case_generations = item.pop('generations', [])
+            if created_by is not None:
+                item['created_by'] = created_by
+            if not item.get('case_no'):
+                item['case_no'] = next(case_numbers)
+
+            case = Case(**item)
+            case.appellant_count = len(case_appellants)
+            case.minor_count = sum(1 for appellant in case_appellants if appellant.is_minor)
+            case.total_payment = schedule.quote(case.appellant_count - case.minor_count, case.minor_count)
+            cases.append(case)
+            appellants.append(case_appellants)
+            generations.append(case_generations)
+        Case.objects.bulk_create(cases)
+
+        Case.appellants.through.objects.bulk_create([
+            Case.appellants.through(case_id=case.pk, appellant_id=appellant.pk)
+            for case, case_appellants in zip(cases, appellants)
+            for appellant in case_appellants
+        ])
+        Generation.objects.bulk_create([
+            Generation(case=case, **{key: value for key, value in data.items() if key != 'id'})
+            for case, case_generations in zip(cases, generations)
+            for data in case_generations
+        ])
+        CaseSetupJob.objects.bulk_create([CaseSetupJob(case=case) for case in cases])
+        refresh_case_search([case.pk for case in cases])
+        apply_stats_changes(added=[stat_row(case) for case in cases])
+
+    return cases
@@ -1,25 +1,195 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from .models import AppellantFile, Appellant
-from .google_drive_service import upload_appellant_file_to_case_drive, upload_existing_appellant_files_to_case
-import os
+from users.models import CustomUser
+from .models import Address, Appellant, AppellantFile, Case, FeeSchedule, Generation
+from .drive_sync import sync_case_files, sync_file_to_cases
+from .upload_queue import enqueue_upload
+from .fees import clear_fee_schedule_cache
+from .appellant_counts import refresh_appellant_counts
+from .freshness import touch_appellants, touch_cases
+from .case_stats import STAT_FIELDS, apply_stats_changes, forget_lawyer, stat_row
+from .search import APPELLANT_SEARCH_FIELDS, CASE_SEARCH_FIELDS, refresh_appellant_search, refresh_case_search
 
 @receiver(post_save, sender=AppellantFile)
 def upload_file_to_drive(sender, instance, created, **kwargs):
-    if created and instance.appellant.case:
-        file_path = instance.file.path
-        file_name = os.path.basename(instance.file.name)  # <== FIXED
-        case = instance.appellant.case
-
-        file_id, view_link = upload_appellant_file_to_case_drive(case, file_path, file_name)
-        if file_id:
-            instance.drive_file_id = file_id
-            instance.drive_file_link = view_link
-            instance.save()
-        
+    if not created:
+        return
+
+    if instance.drive_file_id:
+        # Streamed straight to Drive during the request
+        transaction.on_commit(lambda: sync_file_to_cases(instance))
+    else:
+        # Uploading happens in the background worker, not inside the request
+        enqueue_upload(instance)
+
+
+@receiver(m2m_changed, sender=Case.appellants.through)
+def sync_files_when_appellants_added(sender, instance, action, reverse, pk_set, **kwargs):
+    # Only new memberships need copying; everything else is already in the ledger
+    if action != "post_add" or not pk_set:
+        return
+
+    if reverse:
+        # appellant.cases.add(...): instance is the appellant, pk_set holds case ids
+        pairs = [(case, [instance.pk]) for case in Case.objects.filter(pk__in=pk_set)]
+    else:
+        pairs = [(instance, list(pk_set))]
+
+    for case, appellant_ids in pairs:
+        transaction.on_commit(lambda case=case, ids=appellant_ids: sync_case_files(case, ids))
+
+
+@receiver(m2m_changed, sender=Case.appellants.through)
+def update_appellant_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # appellant.cases.*: instance is the appellant, pk_set holds case ids
+        if action == "pre_clear":
+            instance._cleared_case_ids = list(instance.cases.values_list("pk", flat=True))
+        elif action in ("post_add", "post_remove") and pk_set:
+            refresh_appellant_counts(pk_set)
+            touch_cases(pk_set)
+        elif action == "post_clear":
+            refresh_appellant_counts(getattr(instance, "_cleared_case_ids", []))
+            touch_cases(getattr(instance, "_cleared_case_ids", []))
+    elif action in ("post_add", "post_remove", "post_clear"):
+        refresh_appellant_counts([instance.pk])
+        touch_cases([instance.pk])
+        # So a later instance.save() doesn't write the old counts back
+        instance.refresh_from_db(fields=["appellant_count", "minor_count", "updated_at"])
+
+
+@receiver(m2m_changed, sender=Case.appellants.through)
+def update_case_search_of_appellants(sender, instance, action, reverse, pk_set, **kwargs):
+    # Appellant names are part of the case's search_vector
+    if reverse:
+        if action in ("post_add", "post_remove") and pk_set:
+            refresh_case_search(pk_set)
+        elif action == "post_clear":
+            # Stashed by update_appellant_counts on pre_clear
+            refresh_case_search(getattr(instance, "_cleared_case_ids", []))
+    elif action in ("post_add", "post_remove", "post_clear"):
+        refresh_case_search([instance.pk])
+
+
+@receiver(post_save, sender=Case)
+def update_search_of_saved_case(sender, instance, created, **kwargs):
+    # Not for every payment or status save: only when a searchable value differs from the one loaded
+    # (loaddata saves without Case.save(), so without _changed_fields)
+    if created or CASE_SEARCH_FIELDS & getattr(instance, "_changed_fields", CASE_SEARCH_FIELDS):
+        refresh_case_search([instance.pk])
+
 
 @receiver(post_save, sender=Appellant)
-def upload_files_when_case_added(sender, instance, **kwargs):
-    print('instance.case: ', instance.case)
-    if instance.case:
-        upload_existing_appellant_files_to_case(instance)
\ No newline at end of file
+def update_search_of_saved_appellant(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not APPELLANT_SEARCH_FIELDS & set(update_fields):
+        return
+    refresh_appellant_search([instance.pk])
+    if not created:
+        refresh_case_search(instance.cases.values("pk"))
+
+
+@receiver(post_save, sender=Appellant)
+def update_cases_of_saved_appellant(sender, instance, created, update_fields=None, **kwargs):
+    # A new appellant isn't in any case yet
+    if created:
+        return
+    # The appellant is nested in its cases' representation
+    touch_cases(instance.cases.values("pk"))
+    if update_fields is None or "is_minor" in update_fields:
+        refresh_appellant_counts(instance.cases.values("pk"))
+
+
+@receiver(pre_delete, sender=Appellant)
+def remember_cases_of_deleted_appellant(sender, instance, **kwargs):
+    # The M2M rows go with the appellant without an m2m_changed signal
+    instance._deleted_from_case_ids = list(instance.cases.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Appellant)
+def update_counts_of_deleted_appellant(sender, instance, **kwargs):
+    refresh_appellant_counts(getattr(instance, "_deleted_from_case_ids", []))
+    refresh_case_search(getattr(instance, "_deleted_from_case_ids", []))
+    touch_cases(getattr(instance, "_deleted_from_case_ids", []))
+
+
+@receiver(post_save, sender=AppellantFile)
+@receiver(post_delete, sender=AppellantFile)
+def touch_owner_of_file(sender, instance, **kwargs):
+    touch_appellants([instance.appellant_id])
+
+
+@receiver(post_save, sender=Generation)
+@receiver(post_delete, sender=Generation)
+def touch_case_of_generation(sender, instance, **kwargs):
+    touch_cases([instance.case_id])
+
+
+@receiver(post_save, sender=Address)
+def touch_cases_of_saved_address(sender, instance, created, **kwargs):
+    # Rendered inside the case as marriage_place / grand_parents_dop; a new address isn't on any case yet
+    if not created:
+        touch_cases(Case.objects.filter(Q(marriage_place=instance) | Q(grand_parents_dop=instance)).values("pk"))
+
+
+@receiver(pre_delete, sender=Address)
+def touch_cases_of_deleted_address(sender, instance, **kwargs):
+    # Their cases keep existing with the address set to NULL, which sends no Case signals
+    touch_cases(Case.objects.filter(Q(marriage_place=instance) | Q(grand_parents_dop=instance)).values("pk"))
+
+
+@receiver(post_save, sender=FeeSchedule)
+@receiver(post_delete, sender=FeeSchedule)
+def forget_cached_fee_schedule(sender, **kwargs):
+    transaction.on_commit(clear_fee_schedule_cache)
+
+
+def _changes_stats(update_fields):
+    return update_fields is None or {"status", "payment_status", "lawyer", "lawyer_id", "total_payment"} & set(update_fields)
+
+
+@receiver(pre_save, sender=Case)
+def remember_case_stats(sender, instance, update_fields=None, **kwargs):
+    # What the row contributes to the summary before this save
+    instance._stats_before = None
+    if not instance._state.adding and _changes_stats(update_fields):
+        instance._stats_before = Case.objects.filter(pk=instance.pk).values_list(*STAT_FIELDS).first()
+
+
+@receiver(post_save, sender=Case)
+def update_case_stats(sender, instance, created, update_fields=None, **kwargs):
+    if not created and not _changes_stats(update_fields):
+        return
+    before, after = getattr(instance, "_stats_before", None), stat_row(instance)
+    if before != after:
+        apply_stats_changes(removed=[before] if before else [], added=[after])
+
+
+@receiver(post_delete, sender=Case)
+def remove_case_from_stats(sender, instance, **kwargs):
+    apply_stats_changes(removed=[stat_row(instance)])
+
+
+# What UserSerializer renders of the users nested in cases (lawyer, created_by) and appellants
+NESTED_USER_FIELDS = {"email", "first_name", "last_name", "role"}
+
+
+@receiver(post_save, sender=CustomUser)
+def touch_records_of_saved_user(sender, instance, created, update_fields=None, **kwargs):
+    # A new user isn't on any record yet; logins only write last_login
+    if created or (update_fields is not None and not NESTED_USER_FIELDS & set(update_fields)):
+        return
+    touch_cases(Case.objects.filter(Q(lawyer=instance) | Q(created_by=instance)).values("pk"))
+    touch_appellants(Appellant.objects.filter(user=instance).values("pk"))
+
+
+@receiver(pre_delete, sender=CustomUser)
+def touch_cases_of_deleted_lawyer(sender, instance, **kwargs):
+    # Their cases keep existing with lawyer set to NULL, which sends no Case signals
+    touch_cases(Case.objects.filter(lawyer=instance).values("pk"))
+
+
+@receiver(post_delete, sender=CustomUser)
+def move_stats_of_deleted_lawyer(sender, instance, **kwargs):
+    forget_lawyer(instance.pk)
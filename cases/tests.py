@@ -1,3 +1,579 @@
-from django.test import TestCase
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from users.models import CustomUser, UserRoles
+from .case_numbers import allocate_case_numbers, format_case_no
+from .drive_backends import DriveError, get_drive_backend
+from .drive_backends.local import LocalDriveBackend
+from .drive_backends.throttle import ThrottledDriveBackend, TokenBucket
+from .services import bulk_create_cases
+from . import fees
+from .case_stats import rebuild_case_stats
+from .fees import get_fee_schedule, recompute_total_payments
+from .google_drive_service import ensure_case_drive_folder
+from .models import Address, Appellant, AppellantFile, Case, CaseNumberCounter, DriveUploadJob, FeeSchedule, Generation
+from .querysets import cases_visible_to
+from .search import search_appellants, search_cases
+from .upload_queue import process_pending
 
-# Create your tests here.
+
+def legacy_total_payment(adults, minors):
+    """The price ladder Case.calculate_total_payment hard-coded before FeeSchedule existed"""
+    total_people = adults + minors
+    ladder = {1: 2500, 2: 2500, 3: 3000, 4: 3500, 5: 4000, 6: 4500, 7: 5000, 8: 5500, 9: 6000, 10: 6500, 11: 7000, 12: 7500}
+    base_amount = ladder.get(total_people, 7500)
+    registration_number_fee = total_people * 350 if total_people < 7 else 500 * total_people
+    return base_amount + adults * 600 + 200 + registration_number_fee + 350 + 27
+
+
+class FeeScheduleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def assertMatchesLegacy(self, schedule):
+        for people in range(1, 21):
+            for minors in range(people + 1):
+                adults = people - minors
+                with self.subTest(adults=adults, minors=minors):
+                    self.assertEqual(schedule.quote(adults, minors), Decimal(legacy_total_payment(adults, minors)))
+
+    def test_built_in_prices_match_legacy_ladder(self):
+        self.assertMatchesLegacy(FeeSchedule())
+
+    def test_seeded_schedule_matches_legacy_ladder(self):
+        # Stored by migration, so base_amounts went through the JSON column
+        schedule = get_fee_schedule()
+        self.assertIsNotNone(schedule.pk)
+        self.assertMatchesLegacy(schedule)
+
+
+class ThrottledDriveBackendTests(SimpleTestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        self.backend = LocalDriveBackend(root=root)
+        self.drive = ThrottledDriveBackend(self.backend, max_attempts=3, base_delay=0.001, max_delay=0.01)
+        self.folder = self.backend.create_folder("folder")
+        self.backend.calls = 0
+
+    def make_file(self, content=b"content"):
+        upload = self.backend.start_upload("file.txt", folder_id=self.folder)
+        upload.write(content)
+        file_id, _ = upload.finish()
+        self.backend.calls = 0
+        return file_id
+
+    def assertMetrics(self, **expected):
+        metrics = self.drive.metrics()
+        self.assertEqual({key: metrics[key] for key in expected}, expected)
+
+    def test_rate_limited_calls_are_retried(self):
+        for status, reason in ((429, None), (403, "userRateLimitExceeded")):
+            with self.subTest(status=status, reason=reason):
+                self.backend.fail_next(status=status, reason=reason)
+                self.assertTrue(self.drive.create_folder("retried"))
+        self.assertEqual(self.backend.calls, 4)
+        self.assertMetrics(calls=2, throttled=2, retried=2, failed=0)
+
+    def test_server_errors_are_retried(self):
+        self.backend.fail_next(2, status=503)
+        self.assertTrue(self.drive.create_folder("retried"))
+        self.assertMetrics(calls=1, throttled=0, retried=2, failed=0)
+
+    def test_client_errors_are_not_retried(self):
+        for status, reason in ((404, "notFound"), (403, "insufficientFilePermissions")):
+            with self.subTest(status=status, reason=reason):
+                self.backend.fail_next(status=status, reason=reason)
+                with self.assertRaises(DriveError) as raised:
+                    self.drive.create_folder("not retried")
+                self.assertEqual(raised.exception.status, status)
+        self.assertEqual(self.backend.calls, 2)
+        self.assertMetrics(calls=2, throttled=0, retried=0, failed=2)
+
+    def test_gives_up_after_max_attempts(self):
+        self.backend.fail_next(3, status=429)
+        with self.assertRaises(DriveError):
+            self.drive.create_folder("given up")
+        self.assertEqual(self.backend.calls, 3)
+        self.assertMetrics(calls=1, throttled=3, retried=2, failed=1)
+
+    def test_batch_copy_retries_only_failed_items(self):
+        file_ids = [self.make_file() for _ in range(3)]
+        # The first copy of the batch is throttled, the other two go through
+        self.backend.fail_next(status=429)
+        results = self.drive.batch_copy(file_ids, self.folder)
+
+        self.assertEqual(self.backend.calls, 4)
+        self.assertTrue(all(copied_id and error is None for copied_id, _, error in results.values()))
+        self.assertMetrics(calls=2, throttled=1, retried=1, failed=0)
+
+    def test_download_chunks_are_retried(self):
+        file_id = self.make_file(b"streamed")
+        self.backend.fail_next(status=503)
+        self.assertEqual(b"".join(self.drive.download_chunks(file_id)), b"streamed")
+        self.assertMetrics(calls=1, retried=1, failed=0)
+
+    def test_bucket_queues_callers_beyond_the_burst(self):
+        drive = ThrottledDriveBackend(self.backend, rate=50, burst=2)
+        for _ in range(4):
+            drive.create_folder("queued")
+        metrics = drive.metrics()
+        self.assertEqual(metrics["queued"], 2)
+        # Two tokens short at 50 per second
+        self.assertGreaterEqual(metrics["queued_seconds"], 0.03)
+
+    def test_bucket_pause_holds_callers_back(self):
+        bucket = TokenBucket(rate=1000, capacity=10)
+        bucket.pause(0.05)
+        self.assertGreater(bucket.acquire(), 0.03)
+
+
+class RecomputeTotalPaymentsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = CustomUser.objects.create_user(email="totals@example.com", password=None, role=UserRoles.ADMIN)
+        self.unpaid = Case.objects.create(case_no="R-1", payment_status="PENDING", total_payment=1, drive_folder_id="folder", created_by=user)
+        self.paid = Case.objects.create(case_no="R-2", payment_status="COMPLETED", total_payment=1, drive_folder_id="folder", created_by=user)
+
+    def test_reprices_unpaid_cases_only(self):
+        changes = recompute_total_payments(Case.objects.exclude(payment_status="COMPLETED"))
+        self.assertEqual([change[0] for change in changes], [self.unpaid.pk])
+        self.assertEqual(Case.objects.get(pk=self.paid.pk).total_payment, 1)
+        self.assertEqual(rebuild_case_stats(), [])
+
+    def test_case_paid_after_being_picked_is_left_alone(self):
+        with_appellant_counts = fees.with_appellant_counts
+
+        def paid_meanwhile(cases):
+            Case.objects.filter(pk=self.unpaid.pk).update(payment_status="COMPLETED")
+            return with_appellant_counts(cases)
+
+        with mock.patch.object(fees, "with_appellant_counts", paid_meanwhile):
+            changes = recompute_total_payments(Case.objects.exclude(payment_status="COMPLETED"))
+        self.assertEqual(changes, [])
+        self.assertEqual(Case.objects.get(pk=self.unpaid.pk).total_payment, 1)
+
+
+def run_in_threads(count, target):
+    """Run target(i) in `count` threads released together; returns the exceptions they raised"""
+    barrier = threading.Barrier(count)
+    errors = []
+
+    def run(i):
+        try:
+            barrier.wait()
+            target(i)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def use_local_drive(test, **options):
+    """Point DRIVE_BACKEND at a LocalDriveBackend in a temporary directory for the test; returns that directory.
+
+    Without it, saving a case without drive_folder_id reaches the real Google Drive (and its OAuth flow).
+    """
+    root = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, root, ignore_errors=True)
+    drive = test.settings(
+        DRIVE_BACKEND="cases.drive_backends.local.LocalDriveBackend",
+        DRIVE_BACKEND_OPTIONS={"root": root, **options},
+    )
+    drive.enable()
+    test.addCleanup(drive.disable)
+    return root
+
+
+class CaseNumberConcurrencyTests(TransactionTestCase):
+    threads = 8
+    cases_per_thread = 5
+
+    def setUp(self):
+        use_local_drive(self)
+        self.user = CustomUser.objects.create_user(email="numbers@example.com", password=None, role=UserRoles.ADMIN)
+        self.year = datetime.datetime.now().year
+
+    def create_cases(self, i):
+        for _ in range(self.cases_per_thread):
+            Case.objects.create(created_by=self.user, total_payment=0)
+
+    def assertConsecutive(self, first):
+        case_nos = list(Case.objects.values_list("case_no", flat=True))
+        expected = [format_case_no(self.year, number) for number in range(first, first + len(case_nos))]
+        self.assertEqual(len(case_nos), self.threads * self.cases_per_thread)
+        self.assertEqual(sorted(case_nos), sorted(expected))
+
+    def test_parallel_cases_get_distinct_numbers(self):
+        self.assertEqual(run_in_threads(self.threads, self.create_cases), [])
+        self.assertConsecutive(1)
+
+    def test_parallel_allocations_do_not_overlap(self):
+        allocated = []
+        errors = run_in_threads(self.threads, lambda i: allocated.extend(allocate_case_numbers(3)))
+        self.assertEqual(errors, [])
+        self.assertEqual(len(allocated), len(set(allocated)))
+        self.assertEqual(len(allocated), self.threads * 3)
+
+    def test_numbers_widen_past_9999(self):
+        CaseNumberCounter.objects.create(year=self.year, last_number=9990)
+        self.assertEqual(run_in_threads(self.threads, self.create_cases), [])
+        self.assertConsecutive(9991)
+        self.assertTrue(Case.objects.filter(case_no=format_case_no(self.year, 10000)).exists())
+
+        # Without the counter, numbering resumes after the highest number, not after "9999"
+        CaseNumberCounter.objects.all().delete()
+        self.assertEqual(allocate_case_numbers(), [format_case_no(self.year, 9991 + self.threads * self.cases_per_thread)])
+
+
+class ExplicitCaseNumberTests(TestCase):
+    """Numbers typed in by hand are never handed out again by the counter"""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email="explicit@example.com", password=None, role=UserRoles.ADMIN)
+        self.year = datetime.datetime.now().year
+        CaseNumberCounter.objects.create(year=self.year, last_number=40)
+
+    def test_saved_case_no_moves_counter(self):
+        Case.objects.create(case_no=format_case_no(self.year, 42), drive_folder_id="folder", total_payment=0, created_by=self.user)
+        self.assertEqual(allocate_case_numbers(2), [format_case_no(self.year, 43), format_case_no(self.year, 44)])
+
+    def test_changed_case_no_moves_counter(self):
+        case = Case.objects.create(drive_folder_id="folder", total_payment=0, created_by=self.user)
+        self.assertEqual(case.case_no, format_case_no(self.year, 41))
+        case = Case.objects.get(pk=case.pk)
+        case.case_no = format_case_no(self.year, 50)
+        case.save()
+        self.assertEqual(allocate_case_numbers(), [format_case_no(self.year, 51)])
+
+    def test_lower_case_no_leaves_counter(self):
+        Case.objects.create(case_no=format_case_no(self.year, 7), drive_folder_id="folder", total_payment=0, created_by=self.user)
+        self.assertEqual(allocate_case_numbers(), [format_case_no(self.year, 41)])
+
+    def test_bulk_create_moves_counter_before_allocating(self):
+        cases = bulk_create_cases([
+            {"case_no": format_case_no(self.year, 42), "drive_folder_id": "folder", "total_payment": 0},
+            {"drive_folder_id": "folder", "total_payment": 0},
+        ], created_by=self.user)
+        self.assertEqual([case.case_no for case in cases], [format_case_no(self.year, 42), format_case_no(self.year, 43)])
+
+
+@override_settings(ALLOWED_HOSTS=["*"])
+class QueryCountTests(TestCase):
+    """Reads take a fixed number of queries, however many rows and related rows there are"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = CustomUser.objects.create_user(email="admin@example.com", password=None, role=UserRoles.ADMIN)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.created = 0
+
+    def make_case(self, appellants=1, files=1):
+        # Distinct users and addresses per case, so per-row lookups would show up as extra queries
+        self.created += 1
+        n = self.created
+        lawyer = CustomUser.objects.create_user(email=f"lawyer{n}@example.com", password=None, role=UserRoles.INTERNAL_LAWYER)
+        case = Case.objects.create(
+            case_no=f"T-{n}", payment_status="COMPLETED", total_payment=0, lawyer=lawyer, created_by=self.admin,
+            drive_folder_id=f"folder-{n}", marriage_place=Address.objects.create(city=f"City {n}"),
+        )
+        for i in range(appellants):
+            appellant = Appellant.objects.create(user=lawyer, name=f"Appellant {n}-{i}", email=f"a{n}-{i}@example.com", fical_code=f"F{n}-{i}")
+            for j in range(files):
+                AppellantFile.objects.create(appellant=appellant, drive_file_id=f"file-{n}-{i}-{j}", sync_status="synced")
+            case.appellants.add(appellant)
+        Generation.objects.create(case=case, number=1)
+        return case
+
+    def count_queries(self, path):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(context.captured_queries)
+
+    def assertConstantQueries(self, path, grow):
+        """`path` takes as many queries after grow() has added rows as before"""
+        expected = self.count_queries(path)
+        grow()
+        with self.assertNumQueries(expected):
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_case_list(self):
+        self.make_case()
+        for path in ("/api/v1/cases/", "/api/v1/cases/?expand=appellants,lawyer,created_by", "/api/v1/cases/?limit=50"):
+            with self.subTest(path=path):
+                self.assertConstantQueries(path, lambda: [self.make_case(appellants=3, files=2) for _ in range(5)])
+
+    def test_case_detail(self):
+        small = self.make_case()
+        large = self.make_case(appellants=8, files=3)
+        Generation.objects.bulk_create([Generation(case=large, number=n) for n in range(2, 6)])
+        self.assertEqual(self.count_queries(f"/api/v1/cases/{small.pk}/"), self.count_queries(f"/api/v1/cases/{large.pk}/"))
+
+    def test_appellant_list(self):
+        self.make_case()
+        for path in ("/api/v1/appellants/", "/api/v1/appellants/?expand=user"):
+            with self.subTest(path=path):
+                self.assertConstantQueries(path, lambda: self.make_case(appellants=10, files=3))
+
+
+@override_settings(ALLOWED_HOSTS=["*"])
+class ConditionalGetTests(TestCase):
+    """A case answers 304 only while nothing it renders, nested rows included, has changed"""
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(email="etag@example.com", password=None, role=UserRoles.ADMIN)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.address = Address.objects.create(city="Rome")
+        self.case = Case.objects.create(
+            case_no="E-1", payment_status="COMPLETED", total_payment=0, drive_folder_id="folder",
+            created_by=self.admin, lawyer=self.admin, marriage_place=self.address,
+        )
+        self.path = f"/api/v1/cases/{self.case.pk}/"
+
+    def assertChangesETag(self, change):
+        etag = self.client.get(self.path)["ETag"]
+        self.assertEqual(self.client.get(self.path, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        change()
+        self.assertEqual(self.client.get(self.path, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_address_edit(self):
+        self.assertChangesETag(lambda: self.client.patch(f"/api/v1/addresses/{self.address.pk}/", {"city": "Milan"}))
+
+    def test_address_delete(self):
+        self.assertChangesETag(lambda: self.client.delete(f"/api/v1/addresses/{self.address.pk}/"))
+
+    def test_lawyer_rename(self):
+        def rename():
+            self.admin.first_name = "Renamed"
+            self.admin.save()
+        self.assertChangesETag(rename)
+
+
+@override_settings(
+    ALLOWED_HOSTS=["*"], DRIVE_STREAM_UPLOADS=False, DRIVE_UPLOADS_INLINE=False,
+    DRIVE_UPLOAD_MAX_ATTEMPTS=2, DRIVE_RETRY_MAX_ATTEMPTS=1,
+)
+class UploadQueueTests(TransactionTestCase):
+    """POST /appellant-files/ queues the file; process_pending() takes it to the (local) Drive"""
+
+    def setUp(self):
+        self.root = use_local_drive(self)
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        media_root = self.settings(MEDIA_ROOT=media)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+        admin = CustomUser.objects.create_user(email="queue@example.com", password=None, role=UserRoles.ADMIN)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.drive = get_drive_backend().backend
+        self.appellant = Appellant.objects.create(
+            name="Queued", email="queued@example.com", fical_code="Q1", drive_folder_id=self.drive.create_folder("Queued"),
+        )
+
+    def post_file(self, content):
+        response = self.client.post(
+            "/api/v1/appellant-files/",
+            {"appellant": self.appellant.pk, "file": SimpleUploadedFile("document.pdf", content)},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        file_obj = AppellantFile.objects.get(pk=response.json()[0]["id"])
+        self.assertEqual(file_obj.sync_status, "pending")
+        self.assertIsNone(file_obj.drive_file_id)
+        return file_obj
+
+    def test_pending_file_is_uploaded(self):
+        file_obj = self.post_file(b"%PDF-1.4 uploaded")
+        process_pending()
+
+        file_obj.refresh_from_db()
+        self.assertEqual(file_obj.sync_status, "synced")
+        self.assertTrue(file_obj.drive_file_id)
+        with open(os.path.join(self.root, file_obj.drive_file_id), "rb") as f:
+            self.assertEqual(f.read(), b"%PDF-1.4 uploaded")
+        self.assertEqual(file_obj.upload_job.status, "synced")
+
+    def test_failed_upload_is_retried_then_given_up(self):
+        file_obj = self.post_file(b"%PDF-1.4 failing")
+
+        self.drive.fail_next(status=503)
+        process_pending()
+        job = DriveUploadJob.objects.get(appellant_file=file_obj)
+        self.assertEqual((job.status, job.attempts), ("pending", 1))
+        self.assertIn("503", job.last_error)
+        self.assertEqual(AppellantFile.objects.get(pk=file_obj.pk).sync_status, "pending")
+
+        # Not due before its backoff has passed
+        self.assertEqual(process_pending(), [])
+        DriveUploadJob.objects.filter(pk=job.pk).update(next_attempt_at=job.next_attempt_at - datetime.timedelta(hours=1))
+
+        self.drive.fail_next(status=503)
+        process_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("failed", 2))
+        self.assertEqual(AppellantFile.objects.get(pk=file_obj.pk).sync_status, "failed")
+
+
+@override_settings(ALLOWED_HOSTS=["*"])
+class UnpaginatedListTests(TestCase):
+    def test_addresses_and_generations_are_plain_lists(self):
+        user = CustomUser.objects.create_user(email="lists@example.com", password=None, role=UserRoles.ADMIN)
+        case = Case.objects.create(case_no="L-1", drive_folder_id="folder", total_payment=0, created_by=user)
+        Address.objects.create(city="Rome")
+        Generation.objects.create(case=case, number=1)
+        client = APIClient()
+        client.force_authenticate(user)
+        for path in ("/api/v1/addresses/", "/api/v1/generations/"):
+            with self.subTest(path=path):
+                self.assertIsInstance(client.get(path).json(), list)
+
+
+class CaseDriveFolderConcurrencyTests(TransactionTestCase):
+    threads = 8
+
+    def setUp(self):
+        cache.clear()
+        # Latency widens the window in which a second folder could be created
+        self.root = use_local_drive(self, latency=0.05)
+
+        user = CustomUser.objects.create_user(email="folders@example.com", password=None, role=UserRoles.ADMIN)
+        self.case = Case.objects.create(case_no="A-00-0001", drive_folder_id="pending", total_payment=0, created_by=user)
+        Case.objects.filter(pk=self.case.pk).update(drive_folder_id=None)
+
+    def folders(self):
+        folders = []
+        for name in os.listdir(self.root):
+            if name.endswith(".json"):
+                with open(os.path.join(self.root, name)) as f:
+                    metadata = json.load(f)
+                if metadata["name"] == self.case.case_no and metadata["mimeType"] == "application/vnd.google-apps.folder":
+                    folders.append(name[:-len(".json")])
+        return folders
+
+    def assertOneFolder(self, target):
+        # All threads hold an instance loaded before any folder existed
+        cases = [Case.objects.get(pk=self.case.pk) for _ in range(self.threads)]
+        self.assertEqual(run_in_threads(self.threads, lambda i: target(cases[i])), [])
+
+        folders = self.folders()
+        self.assertEqual(len(folders), 1)
+        self.assertEqual({case.drive_folder_id for case in cases}, set(folders))
+        self.assertEqual(Case.objects.get(pk=self.case.pk).drive_folder_id, folders[0])
+
+    def test_parallel_ensure_creates_one_folder(self):
+        self.assertOneFolder(ensure_case_drive_folder)
+
+    def test_parallel_saves_create_one_folder(self):
+        self.assertOneFolder(lambda case: case.save())
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "The role indexes are checked in PostgreSQL plans")
+class CaseVisibilityPlanTests(TestCase):
+    """Each branch of cases_visible_to is answered from its index, already in the list's cursor order"""
+
+    def setUp(self):
+        self.users = {
+            role: CustomUser.objects.create_user(email=f"{role}@example.com", password=None, role=role)
+            for role, _ in UserRoles.choices
+        }
+        for n in range(20):
+            case = Case.objects.create(
+                case_no=f"P-{n}", payment_status="COMPLETED" if n % 2 else "PENDING", total_payment=0,
+                drive_folder_id=f"folder-{n}", lawyer=self.users[UserRoles.INTERNAL_LAWYER],
+                created_by=self.users[UserRoles.EXTERNAL_LAWYER if n % 3 else UserRoles.ADMIN],
+            )
+            case.appellants.add(Appellant.objects.create(
+                name=f"Appellant {n}", email=f"p{n}@example.com", fical_code=f"P{n}", user=self.users[UserRoles.CUSTOMER],
+            ))
+        # A table this small is cheapest to scan whole; make the planner show which index it would use
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def plan(self, role):
+        # The first page of the list, as the cursor paginator asks for it
+        return cases_visible_to(self.users[role]).order_by("-created_at", "-id")[:51].explain()
+
+    def test_role_indexes(self):
+        expected = {
+            UserRoles.SUPER_ADMIN: "case_completed_idx",
+            UserRoles.ADMIN: "case_completed_idx",
+            UserRoles.INTERNAL_LAWYER: "case_lawyer_completed_idx",
+            UserRoles.EXTERNAL_LAWYER: "case_created_by_idx",
+            UserRoles.CUSTOMER: "case_completed_idx",
+        }
+        for role, index in expected.items():
+            with self.subTest(role=role):
+                plan = self.plan(role)
+                self.assertIn(f"using {index} on cases_case", plan)
+                self.assertNotIn("Seq Scan", plan)
+                self.assertNotIn("Sort", plan)
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "Search uses PostgreSQL full text and pg_trgm")
+class SearchTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(email="search@example.com", password=None, role=UserRoles.ADMIN)
+        self.appellant = Appellant.objects.create(name="Giovanni Rossini", email="g@example.com", fical_code="RSSGNN80")
+        self.case = Case.objects.create(
+            case_no="S-1", descendant="Bianchi", drive_folder_id="folder", total_payment=0, created_by=user,
+        )
+        self.case.appellants.add(self.appellant)
+        self.other = Case.objects.create(
+            case_no="S-2", descendant="Verdi", drive_folder_id="folder", total_payment=0, created_by=user,
+        )
+
+    def test_case_found_by_part_of_appellant_name(self):
+        # "Ross" is not a word of the search vector; only the trigram match on appellant names finds it
+        found = list(search_cases(Case.objects.all(), "Ross"))
+        self.assertEqual(found, [self.case])
+        self.assertGreater(found[0].rank, 0)
+
+    def test_appellant_found_by_part_of_name(self):
+        self.assertEqual(list(search_appellants(Appellant.objects.all(), "Ross")), [self.appellant])
+
+    def test_saves_refresh_search_only_when_searchable_fields_change(self):
+        with mock.patch("cases.signals.refresh_case_search") as refresh:
+            case = Case.objects.create(case_no="S-3", drive_folder_id="folder", total_payment=0, created_by=self.case.created_by)
+            self.assertEqual(refresh.call_count, 1)
+
+            case = Case.objects.get(pk=case.pk)
+            case.status = "Court"
+            case.payment_status = "COMPLETED"
+            case.save()
+            self.assertEqual(refresh.call_count, 1)
+
+            case.descendant = "Neri"
+            case.save(update_fields=["status"])
+            self.assertEqual(refresh.call_count, 1)
+            case.save()
+            self.assertEqual(refresh.call_count, 2)
+            case.save()
+            self.assertEqual(refresh.call_count, 2)
+
+    def test_case_found_by_appellant_fiscal_code(self):
+        self.assertEqual(list(search_cases(Case.objects.all(), "RSSGNN80")), [self.case])
@@ -0,0 +1,114 @@
+import hashlib
+import io
+import tempfile
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers
+from . import google_drive_service
+
+
+def compute_content_hash(file):
+    """SHA-256 of a Django File, read chunk by chunk"""
+    hasher = hashlib.sha256()
+    for chunk in file.chunks():
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class DriveUploadedFile(UploadedFile):
+    """An uploaded file whose content was streamed straight to Google Drive.
+
+    Only holds the bytes locally when DRIVE_KEEP_LOCAL_COPY is set; otherwise
+    the file is empty and the Drive id/link are all that is left of it.
+    """
+
+    def __init__(self, file, name, content_type, size, charset, content_type_extra=None,
+                 drive_file_id=None, drive_file_link=None, upload_error=None, has_local_copy=False,
+                 content_hash=None):
+        super().__init__(file, name, content_type, size, charset, content_type_extra)
+        self.content_hash = content_hash
+        self.drive_file_id = drive_file_id
+        self.drive_file_link = drive_file_link
+        self.upload_error = upload_error
+        self.has_local_copy = has_local_copy
+
+
+class DriveStreamingUploadHandler(FileUploadHandler):
+    """Feed the `file` fields of a multipart request into resumable Drive uploads as they arrive"""
+
+    field_name = "file"
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.handling = field_name == self.field_name
+        if not self.handling:
+            return
+
+        self.upload = None
+        self.upload_error = None
+        self.local_copy = None
+        self.hasher = hashlib.sha256()
+        if getattr(settings, "DRIVE_KEEP_LOCAL_COPY", False):
+            self.local_copy = tempfile.NamedTemporaryFile(
+                suffix=".upload", dir=getattr(settings, "FILE_UPLOAD_TEMP_DIR", None)
+            )
+
+        try:
+            self.upload = google_drive_service.start_resumable_upload(
+                self.file_name, content_type, getattr(settings, "DRIVE_STREAM_FOLDER_ID", None)
+            )
+        except Exception as e:
+            self.upload_error = str(e)
+
+        # This handler owns the file; the fallback handlers only see other fields
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.handling:
+            return raw_data
+
+        self.hasher.update(raw_data)
+        if self.local_copy:
+            self.local_copy.write(raw_data)
+        if self.upload and not self.upload_error:
+            try:
+                self.upload.write(raw_data)
+            except Exception as e:
+                self.upload_error = str(e)
+                self.upload.abort()
+        return None
+
+    def file_complete(self, file_size):
+        if not self.handling:
+            return None
+
+        drive_file_id, drive_file_link = None, None
+        if self.upload and not self.upload_error:
+            try:
+                drive_file_id, drive_file_link = self.upload.finish()
+            except Exception as e:
+                self.upload_error = str(e)
+                self.upload.abort()
+
+        if self.local_copy:
+            self.local_copy.seek(0)
+        return DriveUploadedFile(
+            file=self.local_copy or io.BytesIO(),
+            name=self.file_name,
+            content_type=self.content_type,
+            size=file_size,
+            charset=self.charset,
+            content_type_extra=self.content_type_extra,
+            drive_file_id=drive_file_id,
+            drive_file_link=drive_file_link,
+            upload_error=self.upload_error,
+            has_local_copy=self.local_copy is not None,
+            content_hash=self.hasher.hexdigest(),
+        )
+
+    def upload_interrupted(self):
+        if getattr(self, "handling", False):
+            if self.upload:
+                self.upload.abort()
+            if self.local_copy:
+                self.local_copy.close()
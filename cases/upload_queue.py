@@ -0,0 +1,136 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection, transaction
+from .drive_backends import get_drive_backend
+from .drive_sync import sync_file_to_cases
+from .models import AppellantFile, DriveUploadJob
+from .freshness import touch_appellants
+from .job_queue import claim_due_jobs, record_outcome, requeue_failed_jobs
+
+
+# Job ids waiting for the current transaction to commit when DRIVE_UPLOADS_INLINE is set
+_inline = threading.local()
+
+
+def _max_attempts():
+    return getattr(settings, "DRIVE_UPLOAD_MAX_ATTEMPTS", 5)
+
+
+def _concurrency():
+    return getattr(settings, "DRIVE_UPLOAD_CONCURRENCY", 4)
+
+
+def _discard_staged_file(file_obj):
+    """Remove the temp_files/ copy once Drive has the content, unless local copies are kept"""
+    if file_obj.file and not getattr(settings, "DRIVE_KEEP_LOCAL_COPY", False):
+        file_obj.file.delete(save=False)
+        AppellantFile.objects.filter(pk=file_obj.pk).update(file="")
+
+
+def enqueue_upload(appellant_file):
+    """Queue the file for upload; runs it straight away when DRIVE_UPLOADS_INLINE is set.
+
+    Nothing is queued when a file with the same content is already on Drive.
+    """
+    duplicate = appellant_file.find_uploaded_duplicate()
+    if duplicate:
+        AppellantFile.objects.filter(pk=appellant_file.pk).update(
+            drive_file_id=duplicate.drive_file_id, drive_file_link=duplicate.drive_file_link, sync_status="synced"
+        )
+        appellant_file.drive_file_id = duplicate.drive_file_id
+        appellant_file.drive_file_link = duplicate.drive_file_link
+        appellant_file.sync_status = "synced"
+        _discard_staged_file(appellant_file)
+        transaction.on_commit(lambda: sync_file_to_cases(appellant_file))
+        return None
+
+    job, _ = DriveUploadJob.objects.get_or_create(appellant_file=appellant_file)
+    if getattr(settings, "DRIVE_UPLOADS_INLINE", False):
+        if not hasattr(_inline, "job_ids"):
+            _inline.job_ids = []
+        _inline.job_ids.append(job.id)
+        transaction.on_commit(_process_inline_jobs)
+    return job
+
+
+def _process_inline_jobs():
+    # The first callback of a transaction uploads every job it queued, concurrently;
+    # the callbacks registered by the other jobs find nothing left to do
+    job_ids, _inline.job_ids = getattr(_inline, "job_ids", []), []
+    if job_ids:
+        process_pending(limit=len(job_ids), job_ids=job_ids)
+
+
+def claim_jobs(limit=10, job_ids=None):
+    """Lock and mark up to `limit` due jobs as uploading so no other worker picks them up"""
+    jobs = DriveUploadJob.objects.all() if job_ids is None else DriveUploadJob.objects.filter(id__in=job_ids)
+    with transaction.atomic():
+        jobs = claim_due_jobs(jobs, "uploading", getattr(settings, "DRIVE_UPLOAD_STALE_SECONDS", 900), limit)
+        AppellantFile.objects.filter(upload_job__in=jobs).update(sync_status="uploading")
+        touch_appellants(AppellantFile.objects.filter(upload_job__in=jobs).values("appellant_id"))
+    return jobs
+
+
+def process_job(job):
+    """Upload one claimed job's file and record the outcome on both the job and the file"""
+    file_obj = AppellantFile.objects.select_related("appellant").get(pk=job.appellant_file_id)
+
+    # Identical content may have reached Drive since this job was queued
+    duplicate = file_obj.find_uploaded_duplicate()
+
+    try:
+        if duplicate:
+            drive_file_id, drive_link = duplicate.drive_file_id, duplicate.drive_file_link
+        else:
+            # Straight to the backend so a DriveError (after its own retries) lands in last_error
+            drive_file_id, drive_link = get_drive_backend().upload(
+                file_obj.appellant.drive_folder_id,
+                file_obj.file.path,
+                os.path.basename(file_obj.file.name),
+            )
+        error = None if drive_file_id else "Google Drive did not return a file id"
+    except Exception as e:
+        drive_file_id, drive_link, error = None, None, str(e)
+
+    if not error:
+        AppellantFile.objects.filter(pk=file_obj.pk).update(
+            drive_file_id=drive_file_id, drive_file_link=drive_link, sync_status="synced"
+        )
+        file_obj.drive_file_id = drive_file_id
+        _discard_staged_file(file_obj)
+        sync_file_to_cases(file_obj)
+    record_outcome(job, error, "synced", _max_attempts())
+    if error:
+        # pending (to be retried) or failed, like the job
+        AppellantFile.objects.filter(pk=file_obj.pk).update(sync_status=job.status)
+    touch_appellants([file_obj.appellant_id])
+    return job
+
+
+def _process_job_in_thread(job):
+    try:
+        return process_job(job)
+    finally:
+        # Pool threads each open their own connection; don't leak it
+        connection.close()
+
+
+def process_pending(limit=10, job_ids=None, concurrency=None):
+    """Claim one batch of due jobs and upload them on up to `concurrency` threads"""
+    jobs = claim_jobs(limit=limit, job_ids=job_ids)
+    workers = min(concurrency or _concurrency(), len(jobs))
+    if workers <= 1:
+        return [process_job(job) for job in jobs]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_process_job_in_thread, jobs))
+
+
+def requeue_failed():
+    """Give every failed job a fresh set of attempts"""
+    jobs = DriveUploadJob.objects.filter(status="failed")
+    AppellantFile.objects.filter(upload_job__in=jobs).update(sync_status="pending")
+    touch_appellants(AppellantFile.objects.filter(upload_job__in=jobs).values("appellant_id"))
+    return requeue_failed_jobs(jobs)
@@ -10,7 +10,8 @@ from .views import (
     ExecutePaymentView,
     CancelPaymentView,
     DownloadLegalDocumentView,
-    CaseRevisionView
+    CaseRevisionView,
+    DriveMetricsView
     )
 
 router = DefaultRouter()
@@ -26,5 +27,6 @@ urlpatterns = [
     path('payment/execute/<int:case_id>/', ExecutePaymentView.as_view(), name='execute_payment'),
     path('payment/cancel/', CancelPaymentView.as_view(), name='cancel_payment'),
     path('download-legal-document/<int:case_id>/', DownloadLegalDocumentView.as_view(), name='download-legal-document'),
-    path('case-revision/<int:case_id>/', CaseRevisionView.as_view(), name='case-revision')
+    path('case-revision/<int:case_id>/', CaseRevisionView.as_view(), name='case-revision'),
+    path('drive/metrics/', DriveMetricsView.as_view(), name='drive-metrics')
 ]
\ No newline at end of file
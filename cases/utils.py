@@ -45,7 +45,7 @@ def generate_legal_document(case_id):
         p.alignment = WD_ALIGN_PARAGRAPH.LEFT
 
     # Adding list of Appellants
-    if getattr(case, 'appellants', None) and case.appellants.exists():
+    if case.appellant_count:
         for index, appellant in enumerate(case.appellants.all(), start=1):
             appellant_text = (
                 f"{index}) {getattr(appellant, 'name', '')}, nato/a a {getattr(appellant, 'birth_place', '')} "
@@ -1,31 +1,51 @@
 from rest_framework import viewsets
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
-from django.http import FileResponse
+from django.http import FileResponse, StreamingHttpResponse
+from django.db import transaction
 import os
 from .models import Appellant, AppellantFile, Address, Generation, Case
-from .serializers import AppellantSerializer, AppellantFileSerializer, AddressSerializer, GenerationSerializer, CaseSerializer
-import random
-import string
+from users.models import CustomUser
+from .serializers import AppellantSerializer, AppellantFileSerializer, AddressSerializer, GenerationSerializer, CaseSerializer, CaseListSerializer
 from rest_framework.response import Response
 from django.core.mail import send_mail
 from django.conf import settings
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
 from .utils import generate_legal_document, get_object_or_none
+from .upload_handlers import DriveStreamingUploadHandler, DriveUploadedFile
 from django.http import JsonResponse
 from django.shortcuts import render, redirect
 import paypalrestsdk
 from .paypal_integration import configure_paypal
-from users.models import CustomUser, UserRoles
-from .permissions import CanViewCasePermission, CanCreateCasePermission
-
-
-class AppellantViewSet(viewsets.ModelViewSet):
+from .permissions import CanViewCasePermission, CanCreateCasePermission, IsAdminRolePermission
+from .google_drive_service import delete_drive_file, drive_metrics
+from .fees import get_fee_schedule, quote_cases
+from .case_stats import case_stats
+from .services import bulk_create_cases, link_first_appellant_user
+from .querysets import cases_visible_to, with_appellant_details, with_case_details
+from .search import search_appellants, search_cases
+from .filters import CaseFilterSet
+from digymarketing.views import ConditionalGetMixin, SparseFieldsetViewMixin
+from digymarketing.renderers import CSVRenderer, NDJSONRenderer
+
+
+class AppellantViewSet(ConditionalGetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Appellant.objects.all()
     serializer_class = AppellantSerializer
+    cursor_ordering = ('-id',)
     permission_classes = [IsAuthenticated, CanViewCasePermission, CanCreateCasePermission]
 
+    def get_queryset(self):
+        queryset = Appellant.objects.all()
+        terms = self.request.query_params.get('search')
+        if terms and self.action == 'list':
+            queryset = search_appellants(queryset, terms)
+        if self.request.method in SAFE_METHODS:
+            return with_appellant_details(queryset, self.get_serializer())
+        return with_appellant_details(queryset)
+
     def create(self, request, *args, **kwargs):
         data = request.data.copy()
         serializer = self.get_serializer(data=data)
@@ -41,125 +61,208 @@ class AppellantViewSet(viewsets.ModelViewSet):
 class AppellantFileViewSet(viewsets.ModelViewSet):
     queryset = AppellantFile.objects.all()
     serializer_class = AppellantFileSerializer
+    cursor_ordering = ('-id',)
     parser_classes = (MultiPartParser, FormParser)
     permission_classes = [IsAuthenticated, CanViewCasePermission, CanCreateCasePermission]
 
+    def initialize_request(self, request, *args, **kwargs):
+        # Stream uploaded files to Drive while the body is parsed instead of staging them on disk
+        if request.method == 'POST' and getattr(settings, 'DRIVE_STREAM_UPLOADS', True):
+            request.upload_handlers.insert(0, DriveStreamingUploadHandler(request))
+        return super().initialize_request(request, *args, **kwargs)
+
+    def discard_streamed_files(self, files):
+        """Delete the Drive copies the streaming upload handler made of files that won't be kept"""
+        for file in files:
+            if isinstance(file, DriveUploadedFile) and file.drive_file_id:
+                delete_drive_file(file.drive_file_id)
+
     def create(self, request, *args, **kwargs):
         files = request.FILES.getlist('file')
         appellant_id = request.data.get('appellant')
 
         if not appellant_id:
+            self.discard_streamed_files(files)
             return Response({"error": "Appellant ID is required."}, status=status.HTTP_400_BAD_REQUEST)
 
-        created_files = []
-
-        for file in files:
-            serializer = self.get_serializer(data={
-                'appellant': appellant_id,
-                'file': file
-            })
-
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
-            created_files.append(serializer.data)
-
-        return Response(created_files, status=status.HTTP_201_CREATED)
-
+        outcomes, rejected = [], []
 
-class CaseViewSet(viewsets.ModelViewSet):
+        # Committing all files at once lets the inline upload path push them
+        # to Drive concurrently instead of one after another
+        try:
+            with transaction.atomic():
+                for file in files:
+                    serializer = self.get_serializer(data={
+                        'appellant': appellant_id,
+                        'file': file
+                    })
+                    if serializer.is_valid():
+                        outcomes.append((serializer.save().id, None))
+                    else:
+                        outcomes.append((None, {"file": file.name, "errors": serializer.errors}))
+                        rejected.append(file)
+        except Exception:
+            # Rolled back: none of the rows pointing at the streamed files exist
+            self.discard_streamed_files(files)
+            raise
+        self.discard_streamed_files(rejected)
+
+        # Re-read after commit so each entry reports its own sync_status
+        created = AppellantFile.objects.in_bulk([file_id for file_id, _ in outcomes if file_id])
+        results = [self.get_serializer(created[file_id]).data if file_id else error for file_id, error in outcomes]
+        errors = [error for _, error in outcomes if error]
+
+        if not errors:
+            response_status = status.HTTP_201_CREATED
+        elif created:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response(results, status=response_status)
+
+
+class CaseViewSet(ConditionalGetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Case.objects.all()
     serializer_class = CaseSerializer
+    filterset_class = CaseFilterSet
     permission_classes = [IsAuthenticated, CanViewCasePermission, CanCreateCasePermission]
 
     def get_serializer_context(self):
         return {'request': self.request}
 
     def get_queryset(self):
-        user = self.request.user
-        if user.role in ['super_admin', 'admin']:
-            return Case.objects.filter(payment_status="COMPLETED")
-        elif user.role == "customer":
-            return Case.objects.filter(appellants__user=user, payment_status="COMPLETED")
-        elif user.role == "external_lawyer":
-            return Case.objects.filter(created_by=user)
-        return Case.objects.filter(lawyer=user, payment_status="COMPLETED")
+        queryset = cases_visible_to(self.request.user)
+        terms = self.request.query_params.get('search')
+        if terms and self.action in ('list', 'export'):
+            queryset = search_cases(queryset, terms)
+        if self.request.method in SAFE_METHODS:
+            return with_case_details(queryset, self.get_serializer())
+        return with_case_details(queryset)
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return CaseListSerializer
+        return CaseSerializer
 
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
             case = serializer.save()
-            appellants = case.appellants.all()
-
-            if appellants.exists():
-                first_appellant = appellants.first()
-
-                if not first_appellant.user:
-                    # Try to find an existing user by email
-                    existing_user = CustomUser.objects.filter(email=first_appellant.email).first()
-                    print('existing_user: ', existing_user)
-
-                    if existing_user:
-                        # Link existing user to appellant
-                        first_appellant.user = existing_user
-                        first_appellant.save()
-
-                        # Send email to notify case assignment (no password)
-                        subject = "You have been assigned to a new case"
-                        message = (
-                            f"Hello {existing_user.first_name},\n\n"
-                            f"You have been assigned to a new case.\n"
-                            f"Email: {existing_user.email}\n"
-                            f"Role: {existing_user.role}\n\n"
-                            f"You can log in with your existing credentials."
-                        )
-                    else:
-                        # Create a new user and assign it
-                        temp_password = "".join(random.choices(string.ascii_letters + string.digits, k=10))
-                        user = CustomUser.objects.create_user(
-                            email=first_appellant.email,
-                            password=temp_password,
-                            role=UserRoles.CUSTOMER,
-                            first_name=first_appellant.name
-                        )
-                        first_appellant.user = user
-                        first_appellant.save()
-
-                        subject = "Your Case Access Credentials"
-                        message = (
-                            f"Hello {user.first_name},\n\n"
-                            f"You have been assigned to a new case.\n"
-                            f"Email: {user.email}\n"
-                            f"Role: {user.role}\n"
-                            f"Temporary Password: {temp_password}\n\n"
-                            f"Please change your password after logging in."
-                        )
-
-                    # Send email
-                    try:
-                        send_mail(
-                            subject=subject,
-                            message=message,
-                            from_email=settings.DEFAULT_FROM_EMAIL,
-                            recipient_list=[first_appellant.email],
-                            fail_silently=False,
-                        )
-                    except Exception as e:
-                        print(f"Failed to send case email: {e}")
+            link_first_appellant_user(case)
 
             return Response(CaseSerializer(case).data, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Create many cases at once: a list of case objects, or {"cases": [...]}.
+
+        Nothing is created unless every item is valid; errors are reported per item index.
+        """
+        items = request.data.get('cases') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response({"error": "Send a non-empty list of cases."}, status=status.HTTP_400_BAD_REQUEST)
+        max_items = getattr(settings, 'CASE_BULK_MAX_ITEMS', 500)
+        if len(items) > max_items:
+            return Response({"error": f"At most {max_items} cases per request."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # One query per related model for the whole batch instead of one per id
+        appellant_ids, user_ids = set(), set()
+        for item in items:
+            if isinstance(item, dict):
+                if isinstance(item.get('appellants'), list):
+                    appellant_ids.update(pk for pk in item['appellants'] if isinstance(pk, int))
+                user_ids.update(pk for pk in (item.get('lawyer'), item.get('created_by')) if isinstance(pk, int))
+        context = self.get_serializer_context()
+        context['prefetched'] = {
+            Appellant: Appellant.objects.in_bulk(appellant_ids),
+            CustomUser: CustomUser.objects.in_bulk(user_ids),
+        }
+
+        validated, errors, case_numbers = [], [], set()
+        for index, item in enumerate(items):
+            serializer = CaseSerializer(data=item, context=context)
+            if not serializer.is_valid():
+                errors.append({"index": index, "errors": serializer.errors})
+                continue
+            case_no = serializer.validated_data.get('case_no')
+            if case_no and case_no in case_numbers:
+                errors.append({"index": index, "errors": {"case_no": ["Repeated within this batch."]}})
+                continue
+            case_numbers.add(case_no)
+            validated.append(serializer.validated_data)
+        if errors:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        cases = bulk_create_cases(validated, created_by=request.user)
+        return Response({"created": [{"index": index, "id": case.id, "case_no": case.case_no}
+                                     for index, case in enumerate(cases)]},
+                        status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'], renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def export(self, request):
+        """Stream every case the list would return, unpaginated, as ?format=csv or ?format=ndjson"""
+        queryset = self.filter_queryset(self.get_queryset())
+        if not request.query_params.get('search'):
+            queryset = queryset.order_by('id')
+        serializer = self.get_serializer()
+        # Server-side cursor; the prefetches run once per chunk
+        cases = queryset.iterator(chunk_size=getattr(settings, 'CASE_EXPORT_CHUNK_SIZE', 500))
+        renderer = request.accepted_renderer
+
+        response = StreamingHttpResponse(
+            renderer.stream((serializer.to_representation(case) for case in cases), serializer),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
+        response['Content-Disposition'] = f'attachment; filename="cases.{renderer.format}"'
+        return response
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated, IsAdminRolePermission])
+    def stats(self, request):
+        """Case counts and total_payment sums per status, payment status and lawyer, from the CaseStat summary"""
+        return Response(case_stats(), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'])
+    def quote(self, request):
+        """Price many cases at once: {"case_ids": [...]} and/or {"groups": [{"adults": 2, "minors": 1}, ...]}"""
+        case_ids = request.data.get('case_ids', [])
+        groups = request.data.get('groups', [])
+        if not isinstance(case_ids, list) or not isinstance(groups, list):
+            return Response({"error": "case_ids and groups must be lists."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            case_ids = [int(case_id) for case_id in case_ids]
+            counts = [(int(group.get('adults', 0)), int(group.get('minors', 0))) for group in groups]
+        except (AttributeError, TypeError, ValueError):
+            return Response({"error": "case_ids must be integers and each group needs integer adults and minors."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if any(adults < 0 or minors < 0 for adults, minors in counts):
+            return Response({"error": "adults and minors cannot be negative."}, status=status.HTTP_400_BAD_REQUEST)
+
+        schedule = get_fee_schedule()
+        # Only cases the user can see; unknown ids are left out of the answer
+        visible_ids = self.get_queryset().filter(pk__in=case_ids).values('pk')
+        return Response({
+            "schedule_version": schedule.version,
+            "cases": {str(pk): str(total) for pk, total in quote_cases(visible_ids, schedule).items()},
+            "groups": [str(schedule.quote(adults, minors)) for adults, minors in counts],
+        }, status=status.HTTP_200_OK)
+
 class AddressViewSet(viewsets.ModelViewSet):
     queryset = Address.objects.all()
     serializer_class = AddressSerializer
+    # Plain list, as before paging came in; the table has no (created_at, id) index to page on
+    pagination_class = None
     permission_classes = [IsAuthenticated]
 
 
 class GenerationViewSet(viewsets.ModelViewSet):
     queryset = Generation.objects.all()
     serializer_class = GenerationSerializer
+    # Unpaginated, like AddressViewSet
+    pagination_class = None
     permission_classes = [IsAuthenticated]
 
 
@@ -256,3 +359,11 @@ class CaseRevisionView(APIView):
             return Response({"message": "Revision email sent successfully."}, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({"error": f"Failed to send revision email: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class DriveMetricsView(APIView):
+    """Rate limiter and retry counters of the Drive client in this worker process"""
+    permission_classes = [IsAuthenticated, IsAdminRolePermission]
+
+    def get(self, request):
+        return Response(drive_metrics(), status=status.HTTP_200_OK)
@@ -0,0 +1,41 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+
+class CappedLimitOffsetPagination(LimitOffsetPagination):
+    default_limit = settings.REST_FRAMEWORK.get('PAGE_SIZE')
+    max_limit = getattr(settings, 'API_MAX_PAGE_SIZE', 200)
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination, newest first by (created_at, id) unless the view sets `cursor_ordering`.
+
+    With API_OFFSET_PAGINATION on, requests that pass ?limit= or ?offset= get the
+    LimitOffsetPagination response instead, so older clients keep working. So do
+    ?search= requests: results ordered by relevance have no cursor to follow.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 200)
+    offset_paginator = None
+
+    def get_ordering(self, request, queryset, view):
+        return getattr(view, 'cursor_ordering', self.ordering)
+
+    def uses_offset(self, request):
+        if request.query_params.get('search'):
+            return True
+        return getattr(settings, 'API_OFFSET_PAGINATION', True) and (
+            'limit' in request.query_params or 'offset' in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.uses_offset(request):
+            self.offset_paginator = CappedLimitOffsetPagination()
+            return self.offset_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.offset_paginator:
+            return self.offset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,81 @@
+import csv
+import json
+from rest_framework.renderers import BaseRenderer
+from rest_framework.serializers import BaseSerializer, ListSerializer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def serializer_columns(serializer, prefix=''):
+    """Dotted column names of everything the serializer renders, nested serializers included"""
+    columns = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in getattr(serializer, 'expand', ()):
+            field = serializer.nested_serializer(name)
+        if isinstance(field, ListSerializer):
+            field = field.child
+        if isinstance(field, BaseSerializer):
+            columns += serializer_columns(field, f'{prefix}{name}.')
+        else:
+            columns.append(f'{prefix}{name}')
+    return columns
+
+
+def _cell(value, path):
+    # Lists (the appellants of a case, their files, ...) share one cell, separated by "; "
+    if isinstance(value, list):
+        return '; '.join(_cell(item, path) for item in value)
+    if value is None:
+        return ''
+    if path:
+        return _cell(value.get(path[0]) if isinstance(value, dict) else None, path[1:])
+    if isinstance(value, dict):
+        return json.dumps(value, cls=JSONEncoder)
+    return str(value)
+
+
+class _Echo:
+    """File-like object whose write() hands the line back, for streaming csv.writer output"""
+
+    def write(self, value):
+        return value
+
+
+class CSVRenderer(BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def stream(self, rows, serializer):
+        """Yield the header and one line per row, the columns taken from `serializer`"""
+        columns = serializer_columns(serializer)
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow([_cell(row, column.split('.')) for column in columns])
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Error responses and other plain data
+        rows = data if isinstance(data, list) else [data]
+        columns = list(dict.fromkeys(key for row in rows if isinstance(row, dict) for key in row))
+        writer = csv.writer(_Echo())
+        lines = [writer.writerow(columns)] + [
+            writer.writerow([_cell(row.get(column), []) for column in columns]) for row in rows if isinstance(row, dict)
+        ]
+        return ''.join(lines).encode(self.charset)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Newline-delimited JSON: one object per line"""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def stream(self, rows, serializer=None):
+        for row in rows:
+            yield json.dumps(row, cls=JSONEncoder) + '\n'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        return ''.join(self.stream(rows)).encode(self.charset)
@@ -0,0 +1,78 @@
+def split_field_paths(paths):
+    """['a', 'b.c', 'b.d'] -> ({'a', 'b'}, {'b': ['c', 'd']})"""
+    names, nested = set(), {}
+    for path in paths:
+        name, _, rest = path.partition('.')
+        names.add(name)
+        if rest:
+            nested.setdefault(name, []).append(rest)
+    return names, nested
+
+
+class SparseFieldsetMixin:
+    """ModelSerializer mixin for sparse fieldsets and expandable relations.
+
+    fields=[...] keeps only the named fields (default: `default_fields`, else all of them).
+    expand=[...] renders the relations named in `expandable_fields` with their nested serializer
+    instead of as ids (default: `default_expand`). A dotted name such as "appellants.name" is
+    passed on to the nested serializer.
+    """
+    expandable_fields = {}  # name -> (serializer class, many)
+    default_fields = None
+    default_expand = ()
+    # Model fields a serializer field reads besides its own source, for model_columns()
+    column_dependencies = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.nested_fields, self.nested_expand = {}, {}
+        if fields is not None:
+            keep, self.nested_fields = split_field_paths(fields)
+        else:
+            keep = set(self.default_fields) if self.default_fields is not None else None
+
+        if expand is not None:
+            self.expand, self.nested_expand = split_field_paths(expand)
+            if keep is not None:
+                # Asking to expand a relation implies wanting it
+                keep |= self.expand
+        else:
+            self.expand = set(self.default_expand)
+        # "appellants.name" only makes sense with appellants expanded
+        self.expand |= set(self.nested_fields)
+
+        if keep is not None:
+            for name in set(self.fields) - keep:
+                self.fields.pop(name)
+        self.expand &= set(self.expandable_fields) & set(self.fields)
+
+    def nested_serializer(self, name, instance=None):
+        serializer_class, many = self.expandable_fields[name]
+        return serializer_class(
+            instance, many=many, context=self.context,
+            fields=self.nested_fields.get(name), expand=self.nested_expand.get(name),
+        )
+
+    def model_columns(self):
+        """Names of the model fields the kept serializer fields read, for QuerySet.only()"""
+        opts = self.Meta.model._meta
+        concrete = {field.name for field in opts.concrete_fields}
+        columns = {opts.pk.name}
+        for name, field in self.fields.items():
+            if field.write_only:
+                continue
+            source = field.source.split('.')[0]
+            if source in concrete:
+                columns.add(source)
+            columns.update(self.column_dependencies.get(name, ()))
+        return columns
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        for name in self.expand:
+            value = getattr(instance, name)
+            if value is None:
+                continue
+            _, many = self.expandable_fields[name]
+            data[name] = self.nested_serializer(name, value.all() if many else value).data
+        return data
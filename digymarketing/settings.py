@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'corsheaders', 
     'django_filters',
     'rest_framework',
@@ -93,8 +94,15 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'digymarketing.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.getenv('API_PAGE_SIZE', 50)),
 }
 
+# Largest page a client may ask for with ?page_size= (or ?limit=)
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', 200))
+# Keep answering ?limit=/?offset= requests with offset pagination
+API_OFFSET_PAGINATION = os.getenv('API_OFFSET_PAGINATION', 'True') == 'True'
+
 
 from datetime import timedelta
 
@@ -152,6 +160,43 @@ CORS_ALLOWED_ORIGINS = os.getenv("CORS_ALLOWED_ORIGINS", "").split(",")
 
 # GCP Settings
 GOOGLE_CREDENTIALS_FILE = os.getenv('GOOGLE_CREDENTIALS_FILE')
+# Storage backend behind cases.google_drive_service; point it at
+# 'cases.drive_backends.local.LocalDriveBackend' to work without network access
+DRIVE_BACKEND = os.getenv('DRIVE_BACKEND', 'cases.drive_backends.google.GoogleDriveBackend')
+DRIVE_BACKEND_OPTIONS = {}
+GOOGLE_DRIVE_TOKEN_FILE = os.getenv('GOOGLE_DRIVE_TOKEN_FILE', 'token.json')
+GOOGLE_DRIVE_HTTP_TIMEOUT = int(os.getenv('GOOGLE_DRIVE_HTTP_TIMEOUT', 60))
+
+# Drive calls share a per-process token bucket of DRIVE_RATE_LIMIT requests/second
+# (bursts up to DRIVE_RATE_BURST); 403 rate-limit, 429 and 5xx answers are retried
+# with exponential backoff and full jitter
+DRIVE_RATE_LIMIT = float(os.getenv('DRIVE_RATE_LIMIT', 10))
+DRIVE_RATE_BURST = int(os.getenv('DRIVE_RATE_BURST', 20))
+DRIVE_RETRY_MAX_ATTEMPTS = int(os.getenv('DRIVE_RETRY_MAX_ATTEMPTS', 5))
+DRIVE_RETRY_BASE_DELAY = float(os.getenv('DRIVE_RETRY_BASE_DELAY', 1.0))
+DRIVE_RETRY_MAX_DELAY = float(os.getenv('DRIVE_RETRY_MAX_DELAY', 32.0))
+
+# Drive uploads are queued and processed by `manage.py process_upload_jobs`
+DRIVE_UPLOADS_INLINE = os.getenv('DRIVE_UPLOADS_INLINE', 'False') == 'True'
+DRIVE_UPLOAD_MAX_ATTEMPTS = int(os.getenv('DRIVE_UPLOAD_MAX_ATTEMPTS', 5))
+DRIVE_UPLOAD_CONCURRENCY = int(os.getenv('DRIVE_UPLOAD_CONCURRENCY', 4))
+
+# Appellant files are streamed to Drive in DRIVE_STREAM_CHUNK_SIZE pieces while the
+# request is read; set DRIVE_KEEP_LOCAL_COPY to also keep them in MEDIA_ROOT/temp_files
+DRIVE_STREAM_UPLOADS = os.getenv('DRIVE_STREAM_UPLOADS', 'True') == 'True'
+DRIVE_STREAM_CHUNK_SIZE = int(os.getenv('DRIVE_STREAM_CHUNK_SIZE', 8 * 1024 * 1024))
+DRIVE_STREAM_FOLDER_ID = os.getenv('DRIVE_STREAM_FOLDER_ID')
+DRIVE_KEEP_LOCAL_COPY = os.getenv('DRIVE_KEEP_LOCAL_COPY', 'False') == 'True'
+
+# Most cases one POST /api/v1/cases/bulk/ may create; their Drive folders and emails
+# are set up afterwards by `manage.py process_case_jobs`
+CASE_BULK_MAX_ITEMS = int(os.getenv('CASE_BULK_MAX_ITEMS', 500))
+CASE_SETUP_MAX_ATTEMPTS = int(os.getenv('CASE_SETUP_MAX_ATTEMPTS', 5))
+# Cases fetched (and prefetched) per round trip by GET /api/v1/cases/export/
+CASE_EXPORT_CHUNK_SIZE = int(os.getenv('CASE_EXPORT_CHUNK_SIZE', 500))
+
+# Seconds each process keeps the active FeeSchedule before reading it again
+FEE_SCHEDULE_CACHE_TIMEOUT = int(os.getenv('FEE_SCHEDULE_CACHE_TIMEOUT', 300))
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
@@ -0,0 +1,88 @@
+import hashlib
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+
+class SparseFieldsetViewMixin:
+    """Passes comma-separated ?fields= and ?expand= to the serializer of read requests"""
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request is not None and self.request.method in SAFE_METHODS:
+            for param in ('fields', 'expand'):
+                value = self.request.query_params.get(param)
+                if value is not None:
+                    kwargs.setdefault(param, [name for name in value.split(',') if name])
+        return super().get_serializer(*args, **kwargs)
+
+
+class ConditionalGetMixin:
+    """ETag / Last-Modified for list and retrieve, answering 304 before anything is serialized.
+
+    The validators come from `last_modified_field` (a timestamp that related changes also bump).
+    Lists are validated by the page they return: its newest timestamp, its ids (so deletions and
+    reordering show up too) and the pagination links and count around it.
+    """
+    last_modified_field = 'updated_at'
+
+    def _validator_queryset(self):
+        # Just the timestamp: no joins, prefetches or other columns
+        queryset = self.filter_queryset(self.get_queryset())
+        return queryset.select_related(None).prefetch_related(None).only(self.last_modified_field)
+
+    def _loading_last_modified(self, queryset):
+        # Sparse ?fields= querysets only() load what the serializer reads; the validator needs the timestamp too
+        names, defer = queryset.query.deferred_loading
+        if not defer and self.last_modified_field not in names:
+            queryset = queryset.only(*names, self.last_modified_field)
+        return queryset
+
+    def conditional_response(self, request, last_modified, version, view, *args, **kwargs):
+        # The same rows can render differently per query string, format and user
+        key = '|'.join([
+            request.get_full_path(), request.accepted_renderer.format, str(request.user.pk),
+            str(version), last_modified.isoformat() if last_modified else '',
+        ])
+        etag = quote_etag(hashlib.sha256(key.encode()).hexdigest())
+        # HTTP dates have whole seconds; If-None-Match (checked first) catches changes within one
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = view(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self._loading_last_modified(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+
+        last_modified = max((getattr(row, self.last_modified_field) for row in rows), default=None)
+        version = [row.pk for row in rows]
+        if page is not None:
+            # Links and count without serializing anything; no queries either
+            envelope = self.get_paginated_response([]).data
+            version.append({key: value for key, value in envelope.items() if key != 'results'})
+
+        def respond(request, *args, **kwargs):
+            serializer = self.get_serializer(rows, many=True)
+            if page is None:
+                return Response(serializer.data)
+            return self.get_paginated_response(serializer.data)
+
+        return self.conditional_response(request, last_modified, version, respond, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        obj = self._validator_queryset().filter(**{self.lookup_field: kwargs[lookup_url_kwarg]}).first()
+        if obj is None:
+            return super().retrieve(request, *args, **kwargs)  # The usual 404
+        self.check_object_permissions(request, obj)
+        return self.conditional_response(
+            request, getattr(obj, self.last_modified_field), obj.pk, super().retrieve, *args, **kwargs
+        )
@@ -59,6 +59,13 @@ class CustomUser(AbstractBaseUser, PermissionsMixin, TimestampedModel):
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
 
+    class Meta:
+        indexes = [
+            # Cursor pagination order, on its own and under the ?role= filter
+            models.Index(fields=["created_at", "id"]),
+            models.Index(fields=["role", "created_at", "id"]),
+        ]
+
     def __str__(self):
         return f"{self.email} ({self.get_role_display()})"
 
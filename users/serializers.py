@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from .models import CustomUser, UserRoles, PasswordResetToken
+from digymarketing.serializers import SparseFieldsetMixin
 from django.core.mail import send_mail
 from django.utils.timezone import now
 import random
@@ -51,20 +52,21 @@ class UserCreateSerializer(serializers.ModelSerializer):
 
         return user
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
+    full_name = serializers.SerializerMethodField()
 
     class Meta:
         model = CustomUser
-        fields = ["id", "email", "first_name", "last_name", "role", "password"]
+        fields = ["id", "email", "first_name", "last_name", "role", "password", "full_name"]
+
+    column_dependencies = {"full_name": ("first_name", "last_name")}
 
     def create(self, validated_data):
         return CustomUser.objects.create_user(**validated_data)
     
-    def to_representation(self, instance):
-        data = super().to_representation(instance)
-        data['full_name'] = f"{instance.first_name} {instance.last_name}"
-        return data
+    def get_full_name(self, instance):
+        return f"{instance.first_name} {instance.last_name}"
 
 class LoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
@@ -2,7 +2,7 @@ from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.views import APIView
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated, SAFE_METHODS
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 from django.contrib.auth import authenticate
@@ -18,13 +18,20 @@ from .serializers import (
     GetMeSerializer
     )
 from .permissions import IsSuperAdmin
+from digymarketing.views import SparseFieldsetViewMixin
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = CustomUser.objects.all()
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['role'] 
 
+    def get_queryset(self):
+        if self.request.method in SAFE_METHODS:
+            # created_at is the cursor pagination key
+            return CustomUser.objects.only("created_at", *self.get_serializer().model_columns())
+        return CustomUser.objects.all()
+
     def get_serializer_class(self):
         if self.action == "create":
             return UserCreateSerializer